@@ -0,0 +1,245 @@
+'''
+Columnar Export Controller Module
+Arrow IPC / Parquet bulk export of TBL_Tyre_Details for analytics pulls
+
+Rows are read in ID order on a server-side cursor and written as one record
+batch (for Parquet, one row group) per COLUMNAR_BATCH_ROWS rows, so memory
+stays flat for any range. Most ClaimWarranty columns are strings in MySQL;
+the numeric and date ones are typed on the way out, and values that do not
+parse become null.
+
+Incremental pulls: each export is bounded by a watermark, the highest
+matching ID whose Request_Date is at least COLUMNAR_WATERMARK_LAG_SECONDS
+old. It is returned in X-Export-Watermark and in the schema metadata; pass it
+back as after_id to get only newer rows. The lag matters because
+auto-increment IDs are handed out at insert but become visible at commit: a
+slow insert can commit after a higher ID, and a watermark taken at plain
+MAX(ID) would skip it forever. Any insert shorter than the lag is committed
+by the time a row that old sits above it. This assumes the capture app
+writes Request_Date at insert time, on a clock within the lag of this
+server's. Edits to existing rows (Remark, CorrectedValue) do not move the
+watermark, so re-pull the range to pick those up.
+'''
+
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # the columnar export answers 503 without it
+    pa = None
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from Controllers.coreQueries import claim_filters
+from Database.engine import AsyncSessionLocal
+from Database.models import ClaimWarranty
+
+
+try:
+    COLUMNAR_BATCH_ROWS = int(os.environ.get("COLUMNAR_BATCH_ROWS", 10000))
+    COLUMNAR_WATERMARK_LAG_SECONDS = int(os.environ.get("COLUMNAR_WATERMARK_LAG_SECONDS", 300))
+except ValueError:
+    raise RuntimeError("COLUMNAR_BATCH_ROWS and COLUMNAR_WATERMARK_LAG_SECONDS must be integers")
+
+COLUMNAR_COMPRESSION = os.environ.get("COLUMNAR_COMPRESSION", "zstd").lower()
+if COLUMNAR_COMPRESSION not in ("zstd", "lz4", "none"):
+    raise RuntimeError("COLUMNAR_COMPRESSION must be zstd, lz4 or none")
+
+# format -> (media type, file extension)
+COLUMNAR_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Columns exported with a type other than string
+TYPED_COLUMNS = {
+    "ID": "int64",
+    "Flow_Status": "int32",
+    "Result_percentage": "int32",
+    "Odometer_reading": "int64",
+    "Gauge_reading": "float64",
+    "Latitude": "float64",
+    "Longitude": "float64",
+    "Request_Date": "timestamp",
+}
+
+
+def _to_float(value):
+    """Float, or None for blanks, garbage and nan/inf (OCR output is not always a number)."""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _int_converter(bits: int):
+    low, high = -(2 ** (bits - 1)), 2 ** (bits - 1) - 1
+
+    def convert(value):
+        if isinstance(value, int):
+            number = value
+        else:
+            number = _to_float(value)
+            if number is None:
+                return None
+            number = int(number)
+        return number if low <= number <= high else None
+
+    return convert
+
+
+# A value that does not fit its column becomes null rather than failing the
+# batch: by then the response headers are sent and the file would be truncated
+_CONVERTERS = {"int64": _int_converter(64), "int32": _int_converter(32), "float64": _to_float}
+
+
+def _arrow_type(kind: str):
+    return {
+        "int64": pa.int64(),
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+        "timestamp": pa.timestamp("s"),
+        "string": pa.string(),
+    }[kind]
+
+
+def export_schema(after_id: int, watermark: int):
+    fields = [
+        pa.field(column.name, _arrow_type(TYPED_COLUMNS.get(column.name, "string")), nullable=column.name != "ID")
+        for column in ClaimWarranty.__table__.columns
+    ]
+    return pa.schema(fields, metadata={
+        "tyrecheck.after_id": str(after_id),
+        "tyrecheck.watermark": str(watermark),
+        "tyrecheck.exported_at": datetime.now().replace(microsecond=0).isoformat(),
+    })
+
+
+def record_batch(schema, rows):
+    """Rows (tuples in table column order) -> one typed RecordBatch."""
+    values = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, column in zip(schema, values):
+        convert = _CONVERTERS.get(TYPED_COLUMNS.get(field.name))
+        data = [convert(value) for value in column] if convert else list(column)
+        arrays.append(pa.array(data, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+##################### Queries ######################
+
+def _export_terms(after_id: int, filters: dict) -> list:
+    return claim_filters(**filters) + [ClaimWarranty.__table__.c.ID > after_id]
+
+
+def watermark_query(after_id: int, max_rows: Optional[int], filters: dict):
+    """
+    Highest ID the export will include, only counting rows older than the
+    commit lag (see the module docstring); NULL when nothing qualifies.
+    """
+    t = ClaimWarranty.__table__.c
+    settled = datetime.now() - timedelta(seconds=COLUMNAR_WATERMARK_LAG_SECONDS)
+    terms = _export_terms(after_id, filters) + [t.Request_Date <= settled]
+    if not max_rows:
+        return select(func.max(t.ID)).where(*terms)
+    ids = select(t.ID).where(*terms).order_by(t.ID).limit(max_rows).subquery()
+    return select(func.max(ids.c.ID))
+
+
+def export_query(after_id: int, watermark: int, filters: dict):
+    table = ClaimWarranty.__table__
+    return (
+        select(*table.c)
+        .where(*_export_terms(after_id, filters), table.c.ID <= watermark)
+        .order_by(table.c.ID)
+    )
+
+
+async def export_watermark(db: AsyncSession, after_id: int, max_rows: Optional[int], filters: dict) -> Optional[int]:
+    if pa is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"message": "Columnar export needs pyarrow installed"}
+        )
+    result = await db.execute(watermark_query(after_id, max_rows, filters))
+    return result.scalar()
+
+
+##################### Writers ######################
+
+class _ChunkSink:
+    """Write-only file object the Arrow/Parquet writers append to; drained after every batch."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(sink, schema, export_format: str):
+    if export_format == "parquet":
+        return pq.ParquetWriter(sink, schema, compression=COLUMNAR_COMPRESSION)
+    compression = None if COLUMNAR_COMPRESSION == "none" else COLUMNAR_COMPRESSION
+    return pa_ipc.new_stream(sink, schema, options=pa_ipc.IpcWriteOptions(compression=compression))
+
+
+def _write_rows(writer, schema, rows):
+    writer.write_batch(record_batch(schema, rows))
+
+
+async def stream_columnar(export_format: str, after_id: int, watermark: Optional[int], filters: dict):
+    """
+    Async generator of Arrow IPC stream / Parquet bytes for the rows with
+    after_id < ID <= watermark. Opens its own session, like stream_query_rows.
+    With no watermark (nothing new) the output is a valid, empty file.
+    """
+    schema = export_schema(after_id, watermark if watermark is not None else after_id)
+    sink = _ChunkSink()
+    writer = _open_writer(sink, schema, export_format)
+
+    if watermark is not None:
+        async with AsyncSessionLocal() as db:
+            query = export_query(after_id, watermark, filters).execution_options(stream_results=True)
+            result = await db.stream(query)
+            async for partition in result.partitions(COLUMNAR_BATCH_ROWS):
+                # Conversion and compression are CPU-bound; keep them off the event loop
+                await run_in_threadpool(_write_rows, writer, schema, partition)
+                yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
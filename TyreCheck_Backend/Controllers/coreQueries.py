@@ -0,0 +1,313 @@
+'''
+Core Queries Module
+SQLAlchemy Core equivalents of the stored procedures the routes call
+
+The procedure bodies live only in the production database, so these are
+rebuilt from the result shapes the routes and frontend consume. Each query is
+split into a statement builder (`*_query`) and a row shaper (`shape_*`) so the
+same code runs on the async route sessions, on a plain sync engine, and on
+SQLite for local benchmarks (benchmarks/core_queries.py). Formatting that
+MySQL did in SQL (DATE_FORMAT, TIMESTAMPDIFF) happens in the shapers so the
+statements stay portable.
+
+Routes choose per route between the procedure and this module:
+    QUERY_BACKEND=sp|core                          default for every route
+    QUERY_BACKEND_OVERRIDES=claim_details=core,dealers=core
+Check a route with benchmarks/sp_parity.py before switching it to core.
+'''
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from Database.models import ClaimWarranty, DealerMaster
+
+
+QUERY_BACKENDS = ("sp", "core")
+
+# Route names accepted in QUERY_BACKEND_OVERRIDES
+QUERY_ROUTES = ("claim_details", "export_report", "view_claim", "ai_summary", "dealers", "update_claim")
+
+QUERY_BACKEND = os.environ.get("QUERY_BACKEND", "sp").lower()
+if QUERY_BACKEND not in QUERY_BACKENDS:
+    raise RuntimeError("QUERY_BACKEND must be 'sp' or 'core'")
+
+
+def _parse_overrides(raw: str) -> dict:
+    overrides = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        route, _, backend = item.partition("=")
+        route, backend = route.strip(), backend.strip().lower()
+        if route not in QUERY_ROUTES or backend not in QUERY_BACKENDS:
+            raise RuntimeError(f"Invalid QUERY_BACKEND_OVERRIDES entry: {item!r}")
+        overrides[route] = backend
+    return overrides
+
+
+QUERY_BACKEND_OVERRIDES = _parse_overrides(os.environ.get("QUERY_BACKEND_OVERRIDES", ""))
+
+
+def use_core(route: str) -> bool:
+    """True when `route` should run on this module instead of its stored procedure."""
+    return QUERY_BACKEND_OVERRIDES.get(route, QUERY_BACKEND) == "core"
+
+
+def backend_config() -> dict:
+    return {route: QUERY_BACKEND_OVERRIDES.get(route, QUERY_BACKEND) for route in QUERY_ROUTES}
+
+
+##################### Filters ######################
+
+def _day_start(value) -> Optional[datetime]:
+    if not value:
+        return None
+    day = value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+    return datetime(day.year, day.month, day.day)
+
+
+def claim_filters(claim_id=None, dealer=None, service_type=None, from_date=None, to_date=None) -> list:
+    """
+    WHERE terms shared by every claim query. Dates are whole days
+    (the procedures compare DATE(Request_Date)); the upper bound is the start of
+    the next day so the index on Request_Date stays usable.
+    """
+    t = ClaimWarranty.__table__.c
+    terms = []
+    if claim_id:
+        terms.append(t.Claim_Warranty_Id == claim_id)
+    if dealer:
+        terms.append(t.Dealer_Code == dealer)
+    if service_type:
+        terms.append(t.Service_type == service_type)
+    if from_date:
+        terms.append(t.Request_Date >= _day_start(from_date))
+    if to_date:
+        terms.append(t.Request_Date < _day_start(to_date) + timedelta(days=1))
+    return terms
+
+
+##################### USP_GetAllDetails_Paged ######################
+
+def claim_page_query(page: int, per_page: int, **filters):
+    """One page of claims, newest first, one row per Claim_Warranty_Id."""
+    t = ClaimWarranty.__table__.c
+    d = DealerMaster.__table__.c
+    first_request = func.min(t.Request_Date)
+    return (
+        select(
+            t.Claim_Warranty_Id,
+            func.max(d.Dealer_name).label("Dealer_name"),
+            func.max(t.Service_type).label("Service_type"),
+            first_request.label("first_request"),
+            func.max(t.Request_Date).label("last_request"),
+            func.round(func.avg(t.Result_percentage), 2).label("average"),
+        )
+        .select_from(ClaimWarranty.__table__.join(DealerMaster.__table__, t.Dealer_Code == d.Dealer_code))
+        .where(*claim_filters(**filters))
+        .group_by(t.Claim_Warranty_Id)
+        .order_by(first_request.desc(), t.Claim_Warranty_Id.desc())
+        .limit(per_page)
+        .offset((max(1, page) - 1) * per_page)
+    )
+
+
+def claim_count_query(**filters):
+    t = ClaimWarranty.__table__.c
+    d = DealerMaster.__table__.c
+    return (
+        select(func.count(func.distinct(t.Claim_Warranty_Id)))
+        .select_from(ClaimWarranty.__table__.join(DealerMaster.__table__, t.Dealer_Code == d.Dealer_code))
+        .where(*claim_filters(**filters))
+    )
+
+
+def _inspection_time(first: Optional[datetime], last: Optional[datetime]) -> str:
+    if first is None or last is None:
+        return ""
+    seconds = int((last - first).total_seconds())
+    return f"{seconds // 60} minutes {seconds % 60} seconds"
+
+
+def shape_claim_page(rows) -> list:
+    """ClaimWarrantySPSchema rows, formatted the way the procedure formats them."""
+    shaped = []
+    for row in rows:
+        first = row["first_request"]
+        shaped.append({
+            "Claim_Warranty_Id": row["Claim_Warranty_Id"],
+            "Dealer_name": row["Dealer_name"] or "",
+            "Service_type": row["Service_type"] or "",
+            "CreatedDate": first.strftime("%d/%m/%Y %H:%M") if first else "",
+            "TotalAVG": "" if row["average"] is None else f"{float(row['average']):.2f}",
+            "InspectionTime": _inspection_time(first, row["last_request"]),
+            "View": row["Claim_Warranty_Id"],
+        })
+    return shaped
+
+
+async def claim_page(db: AsyncSession, page: int, per_page: int, **filters) -> list:
+    rows = (await db.execute(claim_page_query(page, per_page, **filters))).mappings().all()
+    return shape_claim_page(rows)
+
+
+async def claim_count(db: AsyncSession, **filters) -> int:
+    return int((await db.execute(claim_count_query(**filters))).scalar() or 0)
+
+
+##################### usp_getTyreReportFiltered ######################
+
+# Report column prefix -> ImageType fragment of the tyre row it comes from
+REPORT_IMAGE_TYPES = {
+    "Outside": "outside",
+    "Inside": "inside",
+    "Final": "final",
+    "Gauge": "gauge",
+}
+
+
+def claim_report_query(claim_id=None, from_date=None, to_date=None, dealer=None, limit=None):
+    """One row per claim with the per-image AI outputs pivoted into columns."""
+    t = ClaimWarranty.__table__.c
+    d = DealerMaster.__table__.c
+    image_type = func.lower(t.ImageType)
+
+    def pick(fragment, column):
+        return func.max(case((image_type.like(f"%{fragment}%"), column)))
+
+    return (
+        select(
+            t.Claim_Warranty_Id,
+            func.max(d.Dealer_name).label("Dealer_name"),
+            func.max(t.Dealer_Code).label("Dealer_Code"),
+            pick("outside", t.ai_result).label("OutsideDamageOutput"),
+            pick("inside", t.ai_result).label("InsideDamageOutput"),
+            func.max(t.Final_Defect).label("FinalDamageOutput"),
+            pick("gauge", t.Gauge_reading).label("TreadDepthGaugeOutput"),
+            func.min(t.Request_Date).label("ClaimDate"),
+            *(
+                pick(fragment, t.Exception_Occurred).label(f"{prefix}Exception_Occurred")
+                for prefix, fragment in REPORT_IMAGE_TYPES.items()
+            ),
+        )
+        .select_from(ClaimWarranty.__table__.outerjoin(DealerMaster.__table__, t.Dealer_Code == d.Dealer_code))
+        .where(*claim_filters(claim_id=claim_id, dealer=dealer, from_date=from_date, to_date=to_date))
+        .group_by(t.Claim_Warranty_Id)
+        .order_by(func.min(t.Request_Date).desc())
+        .limit(limit)
+    )
+
+
+async def claim_report(db: AsyncSession, claim_id=None, from_date=None, to_date=None, dealer=None, limit=None) -> list:
+    result = await db.execute(claim_report_query(claim_id, from_date, to_date, dealer, limit))
+    return [dict(row) for row in result.mappings().all()]
+
+
+##################### USP_GetTyreDetailsFromWarranty_ClaimNo ######################
+
+def claim_details_query(claim_id: str):
+    """Every tyre row of one claim, with ai_result also exposed as result_ai for the ViewClaim page."""
+    table = ClaimWarranty.__table__
+    return (
+        select(*table.c, table.c.ai_result.label("result_ai"))
+        .where(table.c.Claim_Warranty_Id == claim_id)
+        .order_by(table.c.ID)
+    )
+
+
+async def claim_details(db: AsyncSession, claim_id: str) -> list:
+    result = await db.execute(claim_details_query(claim_id))
+    return [dict(row) for row in result.mappings().all()]
+
+
+def claim_images_query(claim_ids: list):
+    """Image file of every tyre row of the given claims (the report rows are one per claim and carry none)."""
+    t = ClaimWarranty.__table__.c
+    return (
+        select(t.Claim_Warranty_Id, t.ImageType, t.folder_name, t.Image_name)
+        .where(t.Claim_Warranty_Id.in_(claim_ids), t.Image_name.isnot(None), t.Image_name != "")
+        .order_by(t.Claim_Warranty_Id, t.ID)
+    )
+
+
+##################### usp_get_claimsummary ######################
+
+def claim_summary_query(dealer_id=None, service_type=None, from_date=None, to_date=None, top_list=None, defect_name=None,
+                        offset=None):
+    """Final_Defect counts per dealer, largest first, capped at top_list rows after skipping `offset`."""
+    t = ClaimWarranty.__table__.c
+    d = DealerMaster.__table__.c
+    dealercount = func.count(t.ID)
+    terms = claim_filters(dealer=dealer_id, service_type=service_type, from_date=from_date, to_date=to_date)
+    terms.append(t.Final_Defect.isnot(None))
+    terms.append(t.Final_Defect != "")
+    if defect_name:
+        terms.append(t.Final_Defect == defect_name)
+
+    query = (
+        select(
+            t.Dealer_Code.label("Dealer_code"),
+            func.max(d.Dealer_name).label("Dealer_name"),
+            t.Final_Defect,
+            dealercount.label("dealercount"),
+        )
+        .select_from(ClaimWarranty.__table__.outerjoin(DealerMaster.__table__, t.Dealer_Code == d.Dealer_code))
+        .where(and_(*terms))
+        .group_by(t.Dealer_Code, t.Final_Defect)
+        .order_by(dealercount.desc(), t.Dealer_Code, t.Final_Defect)
+    )
+    if top_list:
+        query = query.limit(top_list)
+    if offset:
+        query = query.offset(offset)
+    return query
+
+
+async def claim_summary(db: AsyncSession, **params) -> list:
+    result = await db.execute(claim_summary_query(**params))
+    return [dict(row) for row in result.mappings().all()]
+
+
+##################### GetAllDealers ######################
+
+def dealers_query():
+    d = DealerMaster.__table__.c
+    return select(d.Dealer_code, d.Dealer_name).order_by(d.Dealer_name)
+
+
+async def all_dealers(db: AsyncSession) -> list:
+    return [dict(row) for row in (await db.execute(dealers_query())).mappings().all()]
+
+
+##################### USP_UpdateTyreDetails ######################
+
+# UpdateClaim field -> TBL_Tyre_Details column
+UPDATE_TYRE_FIELDS = {
+    "remark": "Remark",
+    "corrected_value": "CorrectedValue",
+    "result_percentage": "Result_percentage",
+}
+
+
+def update_tyre_query(claim_id: str, update_id: int, **changes):
+    """
+    Reviewer correction of one tyre row (the row id comes from the claim/type lookup).
+    Only the fields passed in `changes` are written; omitted ones keep their value.
+    """
+    t = ClaimWarranty.__table__.c
+    values = {UPDATE_TYRE_FIELDS[field]: value for field, value in changes.items()}
+    return (
+        update(ClaimWarranty.__table__)
+        .where(t.ID == update_id, t.Claim_Warranty_Id == claim_id)
+        .values(**values)
+    )
+
+
+async def update_tyre_details(db: AsyncSession, claim_id: str, update_id: int, **changes) -> int:
+    """Runs inside the caller's transaction; the caller commits. Returns rows changed."""
+    if not changes:
+        return 0
+    result = await db.execute(update_tyre_query(claim_id, update_id, **changes))
+    return result.rowcount
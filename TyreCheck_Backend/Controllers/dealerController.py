@@ -0,0 +1,58 @@
+'''
+Dealer Controller Module
+Cached dealer master list shared by the routes
+'''
+
+import hashlib
+import os
+
+from sqlalchemy import text
+
+from Database.engine import AsyncSessionLocal
+from Controllers import coreQueries
+from Utils.cache import TTLCache
+from Utils.fastJson import dumps
+
+try:
+    DEALER_CACHE_TTL_SECONDS = int(os.environ.get("DEALER_CACHE_TTL_SECONDS", 600))
+except ValueError:
+    raise RuntimeError("DEALER_CACHE_TTL_SECONDS must be an integer")
+
+# Single entry: {"rows": [...], "body": b"...", "etag": "...", "names": {Dealer_code: Dealer_name}}
+dealer_cache = TTLCache(maxsize=1, ttl=DEALER_CACHE_TTL_SECONDS)
+DEALER_CACHE_KEY = "dealers"
+
+
+async def load_dealers() -> dict:
+    """Return the cached dealer list, calling GetAllDealers only when the cache is cold."""
+    cached = dealer_cache.get(DEALER_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    async with AsyncSessionLocal() as db:
+        if coreQueries.use_core("dealers"):
+            result = await db.execute(coreQueries.dealers_query())
+        else:
+            result = await db.execute(text("CALL tyrecheck.GetAllDealers()"))
+        columns = result.keys()
+        rows = [dict(zip(columns, row)) for row in result.fetchall()]
+
+    # Encoded once per cache fill; the route sends these bytes as they are
+    body = dumps(rows)
+    entry = {
+        "rows": rows,
+        "body": body,
+        "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+        "names": {row.get("Dealer_code"): row.get("Dealer_name") for row in rows},
+    }
+    dealer_cache.set(DEALER_CACHE_KEY, entry)
+    return entry
+
+
+async def get_dealer_name_map() -> dict:
+    """Dealer_code -> Dealer_name, for filling dealer names in Python instead of joining tyre_dealer_masters."""
+    return (await load_dealers())["names"]
+
+
+def invalidate_dealers() -> None:
+    dealer_cache.invalidate(DEALER_CACHE_KEY)
@@ -0,0 +1,308 @@
+'''
+Export Controller Module
+Background PDF report jobs with artifact reuse per filter set
+
+Job state lives on disk in EXPORT_DIR, next to the PDFs, so a poll or
+download served by any uvicorn worker sees it (EXPORT_DIR must be shared by
+all workers):
+    <fingerprint>.pdf          rendered artifact
+    jobs/<job_id>.json         job metadata
+    inflight/<fingerprint>     job_id of the job rendering that artifact
+    latest/<filter key>        fingerprint of the newest artifact for a filter set
+Jobs, artifacts and leftovers older than EXPORT_JOB_TTL_SECONDS are removed by
+cleanup_exports(), run at most every EXPORT_CLEANUP_INTERVAL_SECONDS when jobs
+are created. Reusing an artifact renews its age.
+'''
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from Database.engine import AsyncSessionLocal
+from Controllers import coreQueries
+from Utils.pdfReport import render_claim_report_pdf
+from Utils.uploads import UPLOAD_DIR
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "/tmp/tyrecheck_exports")
+try:
+    EXPORT_PDF_WORKERS = int(os.environ.get("EXPORT_PDF_WORKERS", 2))
+    EXPORT_JOB_TTL_SECONDS = int(os.environ.get("EXPORT_JOB_TTL_SECONDS", 3600))
+except ValueError:
+    raise RuntimeError("EXPORT_PDF_WORKERS and EXPORT_JOB_TTL_SECONDS must be integers")
+
+# Claim ids per IN (...) when looking up the report's images
+IMAGE_LOOKUP_BATCH = 500
+EXPORT_CLEANUP_INTERVAL_SECONDS = 600
+
+JOBS_DIR = os.path.join(EXPORT_DIR, "jobs")
+INFLIGHT_DIR = os.path.join(EXPORT_DIR, "inflight")
+LATEST_DIR = os.path.join(EXPORT_DIR, "latest")
+for _directory in (EXPORT_DIR, JOBS_DIR, INFLIGHT_DIR, LATEST_DIR):
+    os.makedirs(_directory, exist_ok=True)
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+ACTIVE_STATUSES = ("pending", "rendering")
+
+# keep task references alive until they finish
+_running_tasks = set()
+_last_cleanup = 0.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXPORT_PDF_WORKERS)
+    return _pool
+
+
+def normalize_filters(filters: dict) -> dict:
+    """Empty strings and missing keys all mean 'no filter'."""
+    return {key: (filters.get(key) or None) for key in ("claim_id", "fromDate", "toDate", "dealer_code")}
+
+
+def filter_key(filters: dict) -> str:
+    return hashlib.sha256(json.dumps(filters, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def range_fingerprint(filters: dict) -> str:
+    """
+    Fingerprint the filter set plus the rows currently in range. MAX(ID) and
+    COUNT(*) change as soon as a claim lands in (or leaves) the range, which
+    invalidates any cached artifact for the same filters.
+    """
+    where_clauses = []
+    params = {}
+    if filters["claim_id"]:
+        where_clauses.append("Claim_Warranty_Id = :claim_id")
+        params["claim_id"] = filters["claim_id"]
+    if filters["dealer_code"]:
+        where_clauses.append("Dealer_Code = :dealer")
+        params["dealer"] = filters["dealer_code"]
+    if filters["fromDate"]:
+        where_clauses.append("Request_Date >= :from_dt")
+        params["from_dt"] = f"{filters['fromDate']} 00:00:00"
+    if filters["toDate"]:
+        where_clauses.append("Request_Date <= :to_dt")
+        params["to_dt"] = f"{filters['toDate']} 23:59:59"
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+
+    async with AsyncSessionLocal() as db:
+        max_id, row_count = (await db.execute(
+            text(f"SELECT MAX(ID), COUNT(*) FROM TBL_Tyre_Details WHERE {where_sql}"), params
+        )).one()
+
+    return filter_key({**filters, "_max_id": max_id, "_count": row_count})
+
+
+def artifact_path(fingerprint: str) -> str:
+    return os.path.join(EXPORT_DIR, f"{fingerprint}.pdf")
+
+
+def _write_atomic(path: str, data: str) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def save_job(job: dict) -> None:
+    _write_atomic(_job_path(job["job_id"]), json.dumps(job))
+
+
+def load_job(job_id: str) -> Optional[dict]:
+    if not _JOB_ID.match(job_id or ""):
+        return None
+    raw = _read_text(_job_path(job_id))
+    return json.loads(raw) if raw else None
+
+
+def _new_job(filters: dict, fingerprint: str, job_status: str) -> dict:
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": job_status,
+        "filters": filters,
+        "fingerprint": fingerprint,
+        "created_at": time.time(),
+        "finished_at": time.time() if job_status == "done" else None,
+        "rows": None,
+        "error": None,
+    }
+    save_job(job)
+    return job
+
+
+def _claim_inflight(fingerprint: str, job_id: str) -> Optional[dict]:
+    """
+    Register `job_id` as the renderer of `fingerprint`. Returns the job already
+    rendering it instead, if there is one. A marker left by a job that finished
+    or whose worker died (older than EXPORT_JOB_TTL_SECONDS) is taken over.
+    """
+    marker = os.path.join(INFLIGHT_DIR, fingerprint)
+    try:
+        fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        job = load_job(_read_text(marker) or "")
+        if job is not None and job["status"] in ACTIVE_STATUSES and time.time() - job["created_at"] < EXPORT_JOB_TTL_SECONDS:
+            return job
+        _write_atomic(marker, job_id)
+        return None
+    with os.fdopen(fd, "w") as f:
+        f.write(job_id)
+    return None
+
+
+def _release_inflight(fingerprint: str, job_id: str) -> None:
+    marker = os.path.join(INFLIGHT_DIR, fingerprint)
+    if _read_text(marker) == job_id:
+        os.remove(marker)
+
+
+def _replace_latest(filters: dict, fingerprint: str) -> None:
+    """Record `fingerprint` as the newest artifact for the filter set and drop the one it supersedes."""
+    marker = os.path.join(LATEST_DIR, filter_key(filters))
+    previous = _read_text(marker)
+    _write_atomic(marker, fingerprint)
+    if previous and previous != fingerprint and os.path.exists(artifact_path(previous)):
+        os.remove(artifact_path(previous))
+
+
+def cleanup_exports(max_age: int = EXPORT_JOB_TTL_SECONDS) -> int:
+    """Delete jobs, artifacts, markers and temp files older than `max_age` seconds. Returns how many."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for directory in (EXPORT_DIR, JOBS_DIR, INFLIGHT_DIR, LATEST_DIR):
+        for entry in os.scandir(directory):
+            if not entry.is_file():
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+async def claim_images(db, claim_ids: list) -> dict:
+    """Claim_Warranty_Id -> its tyre image rows, fetched IMAGE_LOOKUP_BATCH claims at a time."""
+    images = {}
+    for start in range(0, len(claim_ids), IMAGE_LOOKUP_BATCH):
+        result = await db.execute(coreQueries.claim_images_query(claim_ids[start:start + IMAGE_LOOKUP_BATCH]))
+        for row in result.mappings():
+            images.setdefault(row["Claim_Warranty_Id"], []).append(dict(row))
+    return images
+
+
+async def _run_job(job: dict) -> None:
+    filters = job["filters"]
+    try:
+        async with AsyncSessionLocal() as db:
+            if coreQueries.use_core("export_report"):
+                result = await db.execute(coreQueries.claim_report_query(
+                    filters["claim_id"], filters["fromDate"], filters["toDate"], filters["dealer_code"]
+                ))
+            else:
+                result = await db.execute(text("""
+                    CALL tyrecheck.usp_getTyreReportFiltered(
+                        :p_claim,
+                        :p_FromDate,
+                        :p_ToDate,
+                        :p_dealer
+                    )
+                """), {
+                    "p_claim": filters["claim_id"],
+                    "p_FromDate": filters["fromDate"],
+                    "p_ToDate": filters["toDate"],
+                    "p_dealer": filters["dealer_code"]
+                })
+            columns = list(result.keys())
+            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+            images = await claim_images(db, [row["Claim_Warranty_Id"] for row in rows if row.get("Claim_Warranty_Id")])
+
+        job["status"] = "rendering"
+        job["rows"] = len(rows)
+        save_job(job)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            get_pool(), render_claim_report_pdf,
+            rows, columns, filters, images, UPLOAD_DIR, artifact_path(job["fingerprint"])
+        )
+
+        _replace_latest(filters, job["fingerprint"])
+        job["status"] = "done"
+    except Exception as e:
+        print(f"Export Job Error ({job['job_id']}): {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = time.time()
+        save_job(job)
+        _release_inflight(job["fingerprint"], job["job_id"])
+
+
+async def create_export_job(filters: dict) -> dict:
+    """
+    Start (or reuse) a PDF export for `filters`. Returns the job dict.
+    An up-to-date artifact is reused directly; an identical job already
+    rendering (in any worker) is shared instead of starting a second one.
+    """
+    global _last_cleanup
+    if time.time() - _last_cleanup > EXPORT_CLEANUP_INTERVAL_SECONDS:
+        _last_cleanup = time.time()
+        await run_in_threadpool(cleanup_exports)
+
+    filters = normalize_filters(filters)
+    fingerprint = await range_fingerprint(filters)
+
+    if os.path.exists(artifact_path(fingerprint)):
+        os.utime(artifact_path(fingerprint))
+        return _new_job(filters, fingerprint, "done")
+
+    job = _new_job(filters, fingerprint, "pending")
+    running = _claim_inflight(fingerprint, job["job_id"])
+    if running is not None:
+        os.remove(_job_path(job["job_id"]))
+        return running
+
+    task = asyncio.create_task(_run_job(job))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return job
+
+
+def get_export_job(job_id: str) -> dict:
+    job = load_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Export job not found"}
+        )
+    return job
+
+
+def public_job(job: dict) -> dict:
+    return {k: v for k, v in job.items() if k != "fingerprint"}
@@ -0,0 +1,374 @@
+'''
+Rollup Controller Module
+Incrementally maintained dashboard aggregates (TBL_Claim_Daily_Rollup)
+
+Each refresh folds rows only up to a settled watermark: the highest ID whose
+Request_Date is at least ROLLUP_WATERMARK_LAG_SECONDS old. Auto-increment IDs
+are handed out at insert but become visible at commit, so folding up to plain
+MAX(ID) could pass over a slow insert that commits later, and it would never
+be counted (same reasoning as the columnar export watermark).
+'''
+
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import bindparam, text
+
+from Database.engine import AsyncSessionLocal
+from Controllers.dealerController import get_dealer_name_map
+
+ROLLUP_NAME = "claim_daily"
+try:
+    ROLLUP_BATCH_SIZE = int(os.environ.get("ROLLUP_BATCH_SIZE", 5000))
+    # 0 disables the background refresher
+    ROLLUP_REFRESH_SECONDS = int(os.environ.get("ROLLUP_REFRESH_SECONDS", 60))
+    ROLLUP_WATERMARK_LAG_SECONDS = int(os.environ.get("ROLLUP_WATERMARK_LAG_SECONDS", 300))
+except ValueError:
+    raise RuntimeError("ROLLUP_BATCH_SIZE, ROLLUP_REFRESH_SECONDS and ROLLUP_WATERMARK_LAG_SECONDS must be integers")
+
+# "sp" keeps the summary endpoints on the stored procedures, "rollup" serves them from TBL_Claim_Daily_Rollup
+SUMMARY_SOURCE = os.environ.get("SUMMARY_SOURCE", "sp").lower()
+
+# Aggregates the TBL_Tyre_Details rows matched by {scope} (a condition on alias sl).
+# first_rows marks each claim's lowest ID so a claim is counted exactly once even
+# when its rows straddle two batches or two days.
+AGGREGATE_SQL = """
+    INSERT INTO TBL_Claim_Daily_Rollup (
+        Dealer_Code, Rollup_Date, Service_type, Final_Defect,
+        row_count, claim_count, result_percentage_sum, result_percentage_count
+    )
+    SELECT
+        COALESCE(sl.Dealer_Code, '') AS Dealer_Code,
+        DATE(sl.Request_Date) AS Rollup_Date,
+        COALESCE(sl.Service_type, '') AS Service_type,
+        COALESCE(sl.Final_Defect, '') AS Final_Defect,
+        COUNT(*) AS row_count,
+        SUM(CASE WHEN sl.ID = fr.first_id THEN 1 ELSE 0 END) AS claim_count,
+        COALESCE(SUM(sl.Result_percentage), 0) AS result_percentage_sum,
+        COUNT(sl.Result_percentage) AS result_percentage_count
+    FROM TBL_Tyre_Details sl
+    LEFT JOIN (
+        SELECT Claim_Warranty_Id, MIN(ID) AS first_id
+        FROM TBL_Tyre_Details
+        WHERE Claim_Warranty_Id IN (
+            SELECT DISTINCT sl.Claim_Warranty_Id FROM TBL_Tyre_Details sl WHERE {scope}
+        )
+        GROUP BY Claim_Warranty_Id
+    ) fr ON fr.Claim_Warranty_Id = sl.Claim_Warranty_Id
+    WHERE {scope} AND sl.Request_Date IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON DUPLICATE KEY UPDATE
+        TBL_Claim_Daily_Rollup.row_count = TBL_Claim_Daily_Rollup.row_count + VALUES(row_count),
+        TBL_Claim_Daily_Rollup.claim_count = TBL_Claim_Daily_Rollup.claim_count + VALUES(claim_count),
+        TBL_Claim_Daily_Rollup.result_percentage_sum = TBL_Claim_Daily_Rollup.result_percentage_sum + VALUES(result_percentage_sum),
+        TBL_Claim_Daily_Rollup.result_percentage_count = TBL_Claim_Daily_Rollup.result_percentage_count + VALUES(result_percentage_count)
+"""
+
+# Highest ID that is safe to fold: rows this old have long committed
+SETTLED_MAX_ID_SQL = text("SELECT COALESCE(MAX(ID), 0) FROM TBL_Tyre_Details WHERE Request_Date <= :settled")
+
+# One ID window of new rows
+BATCH_AGGREGATE_SQL = text(AGGREGATE_SQL.format(scope="sl.ID > :from_id AND sl.ID <= :to_id"))
+
+# Every already-folded row of one (dealer, day) cell, to rebuild that cell from scratch
+CELL_AGGREGATE_SQL = text(AGGREGATE_SQL.format(
+    scope="COALESCE(sl.Dealer_Code, '') = :dealer AND sl.Request_Date >= :day "
+          "AND sl.Request_Date < :next_day AND sl.ID <= :last_id"
+))
+
+
+async def get_watermark(db) -> int:
+    last_id = (await db.execute(
+        text("SELECT last_id FROM TBL_Rollup_Watermark WHERE name = :name"), {"name": ROLLUP_NAME}
+    )).scalar()
+    return int(last_id or 0)
+
+
+async def lock_watermark(db) -> int:
+    """
+    Read the watermark with its row locked until the transaction ends. Every
+    refresh/rebuild transaction starts here, so refreshers in other workers or
+    a CLI run queue behind each other instead of folding the same rows twice.
+    """
+    await db.execute(
+        text("INSERT IGNORE INTO TBL_Rollup_Watermark (name, last_id, updated_at) VALUES (:name, 0, NULL)"),
+        {"name": ROLLUP_NAME}
+    )
+    last_id = (await db.execute(
+        text("SELECT last_id FROM TBL_Rollup_Watermark WHERE name = :name FOR UPDATE"), {"name": ROLLUP_NAME}
+    )).scalar()
+    return int(last_id or 0)
+
+
+async def set_watermark(db, last_id: int) -> None:
+    await db.execute(
+        text("UPDATE TBL_Rollup_Watermark SET last_id = :last_id, updated_at = :updated_at WHERE name = :name"),
+        {"name": ROLLUP_NAME, "last_id": last_id, "updated_at": datetime.now()}
+    )
+
+
+async def mark_claim_dirty(db, claim_id: str) -> None:
+    """
+    Queue a claim for re-folding. Call inside the transaction that edits its
+    rows (Result_percentage, Final_Defect, ...) so the mark commits with the edit.
+    """
+    await db.execute(
+        text("INSERT IGNORE INTO TBL_Rollup_Dirty_Claims (Claim_Warranty_Id, marked_at) VALUES (:claim_id, :marked_at)"),
+        {"claim_id": claim_id, "marked_at": datetime.now()}
+    )
+
+
+async def refold_dirty_claims(db) -> int:
+    """
+    Rebuild the (dealer, day) cells holding rows of edited claims, one batch of
+    claims per transaction. Only rows already under the watermark are re-folded;
+    newer ones are picked up by the ID windows as usual.
+    """
+    refolded = 0
+    while True:
+        last_id = await lock_watermark(db)
+        claim_ids = list((await db.execute(
+            text("SELECT Claim_Warranty_Id FROM TBL_Rollup_Dirty_Claims ORDER BY marked_at LIMIT :limit"),
+            {"limit": ROLLUP_BATCH_SIZE}
+        )).scalars().all())
+        if not claim_ids:
+            await db.commit()
+            return refolded
+
+        cells = (await db.execute(
+            text("""
+                SELECT DISTINCT COALESCE(Dealer_Code, '') AS dealer, DATE(Request_Date) AS day
+                FROM TBL_Tyre_Details
+                WHERE Claim_Warranty_Id IN :claim_ids AND ID <= :last_id AND Request_Date IS NOT NULL
+            """).bindparams(bindparam("claim_ids", expanding=True)),
+            {"claim_ids": claim_ids, "last_id": last_id}
+        )).all()
+
+        for dealer, day in cells:
+            day = day if isinstance(day, date) else date.fromisoformat(str(day))
+            await db.execute(
+                text("DELETE FROM TBL_Claim_Daily_Rollup WHERE Dealer_Code = :dealer AND Rollup_Date = :day"),
+                {"dealer": dealer, "day": day}
+            )
+            await db.execute(CELL_AGGREGATE_SQL, {
+                "dealer": dealer, "day": day, "next_day": day + timedelta(days=1), "last_id": last_id
+            })
+
+        await db.execute(
+            text("DELETE FROM TBL_Rollup_Dirty_Claims WHERE Claim_Warranty_Id IN :claim_ids")
+            .bindparams(bindparam("claim_ids", expanding=True)),
+            {"claim_ids": claim_ids}
+        )
+        await db.commit()
+        refolded += len(claim_ids)
+
+
+async def refresh_rollups(max_batches: Optional[int] = None) -> dict:
+    """
+    Re-fold edited claims, then fold the TBL_Tyre_Details rows between the
+    high-water mark and the settled watermark into the rollup, one ID window
+    per transaction so the watermark and aggregates never diverge.
+    Runs from the background refresher and the CLI only, not over HTTP.
+    """
+    batches = 0
+    async with AsyncSessionLocal() as db:
+        refolded = await refold_dirty_claims(db)
+
+        settled = datetime.now() - timedelta(seconds=ROLLUP_WATERMARK_LAG_SECONDS)
+        max_id = int((await db.execute(SETTLED_MAX_ID_SQL, {"settled": settled})).scalar() or 0)
+        start_id = None
+        last_id = 0
+
+        while max_batches is None or batches < max_batches:
+            last_id = await lock_watermark(db)
+            if start_id is None:
+                start_id = last_id
+            if last_id >= max_id:
+                await db.commit()
+                break
+            to_id = min(last_id + ROLLUP_BATCH_SIZE, max_id)
+            await db.execute(BATCH_AGGREGATE_SQL, {"from_id": last_id, "to_id": to_id})
+            await set_watermark(db, to_id)
+            await db.commit()
+            last_id = to_id
+            batches += 1
+
+    return {"from_id": start_id, "to_id": last_id, "max_id": max_id, "batches": batches, "refolded_claims": refolded}
+
+
+async def rebuild_rollups() -> dict:
+    """Drop all aggregates and re-fold the table from ID 0 (use after bulk corrections; CLI only)."""
+    async with AsyncSessionLocal() as db:
+        await lock_watermark(db)
+        await db.execute(text("DELETE FROM TBL_Claim_Daily_Rollup"))
+        await db.execute(text("DELETE FROM TBL_Rollup_Dirty_Claims"))
+        await set_watermark(db, 0)
+        await db.commit()
+    return await refresh_rollups()
+
+
+async def rollup_refresh_loop() -> None:
+    """Background refresher started from main.py."""
+    while True:
+        try:
+            await refresh_rollups()
+        except Exception as e:
+            print(f"Rollup Refresh Error: {e}")
+        await asyncio.sleep(ROLLUP_REFRESH_SECONDS)
+
+
+def _rollup_filters(service_type: Optional[str], dealer: Optional[str], from_date: Optional[str], to_date: Optional[str], alias: str = ""):
+    prefix = f"{alias}." if alias else ""
+    where_clauses = []
+    params = {}
+    if service_type:
+        where_clauses.append(f"{prefix}Service_type = :service_type")
+        params["service_type"] = service_type
+    if dealer:
+        where_clauses.append(f"{prefix}Dealer_Code = :dealer")
+        params["dealer"] = dealer
+    if from_date:
+        where_clauses.append(f"{prefix}Rollup_Date >= DATE(:from_date)")
+        params["from_date"] = from_date
+    if to_date:
+        where_clauses.append(f"{prefix}Rollup_Date <= DATE(:to_date)")
+        params["to_date"] = to_date
+    return (" AND ".join(where_clauses) if where_clauses else "1=1"), params
+
+
+async def summary_from_rollups(service_type: str, dealer: Optional[str], from_date: Optional[str], to_date: Optional[str]) -> dict:
+    """
+    SummaryResult-shaped report from the rollup table. Cost depends on the
+    number of (dealer, day) groups in range, not on TBL_Tyre_Details size.
+    """
+    where_sql, params = _rollup_filters(service_type, dealer, from_date, to_date)
+
+    async with AsyncSessionLocal() as db:
+        percentage_rows = (await db.execute(text(f"""
+            SELECT
+                Service_type AS ServiceType,
+                ROUND(SUM(result_percentage_sum) / NULLIF(SUM(result_percentage_count), 0), 2) AS Percentage,
+                Dealer_Code AS DealerCode,
+                SUM(claim_count) AS TotalCount
+            FROM TBL_Claim_Daily_Rollup
+            WHERE {where_sql}
+            GROUP BY Service_type, Dealer_Code
+            ORDER BY Service_type, Dealer_Code
+        """), params)).mappings().all()
+
+        overall_rows = (await db.execute(text(f"""
+            SELECT
+                ROUND(SUM(result_percentage_sum) / NULLIF(SUM(result_percentage_count), 0), 2) AS Overall,
+                COALESCE(SUM(claim_count), 0) AS WarrantyCount
+            FROM TBL_Claim_Daily_Rollup
+            WHERE {where_sql}
+        """), params)).mappings().all()
+
+    return {
+        "percentage_report": [dict(r) for r in percentage_rows],
+        "overall_summary": [dict(r) for r in overall_rows]
+    }
+
+
+async def defect_summary_from_rollups(service_type: str, dealer: Optional[str], from_date: Optional[str], to_date: Optional[str],
+                                      limit: Optional[int] = None, offset: int = 0) -> list:
+    """Final_Defect distribution per dealer, same row keys as usp_get_claimsummary; paged in SQL when limit is given."""
+    where_sql, params = _rollup_filters(service_type, dealer, from_date, to_date, alias="r")
+    page_sql = ""
+    if limit is not None:
+        page_sql = "LIMIT :limit OFFSET :offset"
+        params.update(limit=limit, offset=offset)
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(text(f"""
+            SELECT
+                r.Dealer_Code AS Dealer_code,
+                r.Final_Defect,
+                SUM(r.row_count) AS dealercount
+            FROM TBL_Claim_Daily_Rollup r
+            WHERE {where_sql} AND r.Final_Defect <> ''
+            GROUP BY r.Dealer_Code, r.Final_Defect
+            ORDER BY r.Dealer_Code, dealercount DESC, r.Final_Defect
+            {page_sql}
+        """), params)).mappings().all()
+
+    dealer_names = await get_dealer_name_map()
+    return [
+        {"Dealer_code": r["Dealer_code"], "Dealer_name": dealer_names.get(r["Dealer_code"]),
+         "Final_Defect": r["Final_Defect"], "dealercount": r["dealercount"]}
+        for r in rows
+    ]
+
+
+def _index_by(rows, keys):
+    return {tuple(str(row.get(k)) for k in keys): row for row in rows}
+
+
+async def check_consistency(service_type: str, dealer: Optional[str], from_date: Optional[str], to_date: Optional[str], tolerance: float = 0.01) -> dict:
+    """
+    Compare the rollup-backed summary with the two summary SPs for the same filters.
+    Returns the mismatching rows; an empty `mismatches` list means the rollups agree.
+    """
+    params = {"servicetype": service_type, "dealer": dealer, "from_date": from_date, "to_date": to_date}
+    async with AsyncSessionLocal() as db:
+        result1 = await db.execute(text("""
+            CALL tyrecheck.USP_DashboardServicetypewise_percentage_Report(
+                :servicetype, :dealer, :from_date, :to_date
+            )
+        """), params)
+        sp_percentage = [dict(zip(result1.keys(), row)) for row in result1.fetchall()]
+
+    async with AsyncSessionLocal() as db:
+        result2 = await db.execute(text("""
+            CALL tyrecheck.USP_DashboardServicetypewiseCountReport(
+                :servicetype, :dealer, :from_date, :to_date
+            )
+        """), params)
+        sp_overall = [dict(zip(result2.keys(), row)) for row in result2.fetchall()]
+
+    rollup = await summary_from_rollups(service_type, dealer, from_date, to_date)
+
+    def differs(a, b) -> bool:
+        if a is None or b is None:
+            return a is not b
+        try:
+            return abs(float(a) - float(b)) > tolerance
+        except (TypeError, ValueError):
+            return str(a) != str(b)
+
+    mismatches = []
+    sp_rows = _index_by(sp_percentage, ("ServiceType", "DealerCode"))
+    rollup_rows = _index_by(rollup["percentage_report"], ("ServiceType", "DealerCode"))
+    for key in sorted(set(sp_rows) | set(rollup_rows)):
+        sp_row, rollup_row = sp_rows.get(key), rollup_rows.get(key)
+        if sp_row is None or rollup_row is None:
+            mismatches.append({"report": "percentage_report", "key": key, "sp": sp_row, "rollup": rollup_row})
+            continue
+        for field in ("Percentage", "TotalCount"):
+            if differs(sp_row.get(field), rollup_row.get(field)):
+                mismatches.append({"report": "percentage_report", "key": key, "field": field,
+                                   "sp": sp_row.get(field), "rollup": rollup_row.get(field)})
+
+    for sp_row, rollup_row in zip(sp_overall, rollup["overall_summary"]):
+        for field in ("Overall", "WarrantyCount"):
+            if differs(sp_row.get(field), rollup_row.get(field)):
+                mismatches.append({"report": "overall_summary", "field": field,
+                                   "sp": sp_row.get(field), "rollup": rollup_row.get(field)})
+
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "refresh"
+    if command == "refresh":
+        print(json.dumps(asyncio.run(refresh_rollups()), indent=2))
+    elif command == "rebuild":
+        print(json.dumps(asyncio.run(rebuild_rollups()), indent=2))
+    else:
+        print("Usage: python -m Controllers.rollupController [refresh|rebuild]")
+        sys.exit(2)
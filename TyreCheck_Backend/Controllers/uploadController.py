@@ -0,0 +1,468 @@
+'''
+Upload Controller Module
+Streaming, validated, atomic writes into UPLOAD_DIR
+'''
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import tarfile
+import time
+import uuid
+import zipfile
+from typing import AsyncIterator
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from Utils.imageManifest import invalidate_folder
+from Utils.manifestIndex import upsert_image, reconcile_folder
+from Utils.singleFlight import invalidate_claim_queries
+from Utils.imageVariants import EAGER_IMAGE_VARIANTS, generate_all_variants, remove_variants
+from Utils.uploads import (
+    UPLOAD_DIR, UPLOAD_CHUNK_BYTES, MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES, safe_name, folder_path,
+    detect_image_type, check_extension, file_sha256
+)
+
+try:
+    # Files unpacked from one archive; its total unpacked size is capped at MAX_BATCH_UPLOAD_BYTES
+    MAX_ARCHIVE_MEMBERS = int(os.environ.get("MAX_ARCHIVE_MEMBERS", 500))
+except ValueError:
+    raise RuntimeError("MAX_ARCHIVE_MEMBERS must be an integer")
+
+
+# keep eager variant tasks referenced until they finish
+_variant_tasks = set()
+
+
+async def refresh_variants(file_path: str, folder_name: str, filename: str) -> None:
+    """Drop stale derived images for a replaced file; re-render them in the background when eager."""
+    invalidate_folder(folder_name)
+    await run_in_threadpool(remove_variants, folder_name, filename)
+    if EAGER_IMAGE_VARIANTS:
+        task = asyncio.create_task(run_in_threadpool(generate_all_variants, file_path, folder_name, filename))
+        _variant_tasks.add(task)
+        task.add_done_callback(_variant_tasks.discard)
+
+
+async def iter_upload_file(file: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def save_image_stream(folder_name: str, filename: str, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    Stream `chunks` into UPLOAD_DIR/<folder_name>/<filename>.
+
+    The data goes to a hidden temp file in the same folder while its size and
+    SHA-256 are tracked; the first chunk must sniff as an image and the total
+    must stay under MAX_UPLOAD_BYTES. The temp file is then renamed into place
+    atomically. If an identical file (same size and hash) already exists the
+    temp file is dropped and the upload is reported as unchanged.
+    """
+    filename = safe_name(os.path.basename(filename or ""), "filename")
+    check_extension(filename)
+    target_folder = folder_path(folder_name)
+    await aiofiles.os.makedirs(target_folder, exist_ok=True)
+
+    file_path = os.path.join(target_folder, filename)
+    tmp_path = os.path.join(target_folder, f".{filename}.{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    image_type = None
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            async for chunk in chunks:
+                if image_type is None:
+                    image_type = detect_image_type(chunk[:16])
+                    if image_type is None:
+                        raise HTTPException(
+                            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail={"message": f"{filename} is not a JPEG, PNG or WebP image"}
+                        )
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail={"message": f"{filename} exceeds {MAX_UPLOAD_BYTES} bytes"}
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+
+        if size == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"message": f"{filename} is empty"}
+            )
+
+        content_hash = digest.hexdigest()
+
+        # Idempotent retry: same bytes already in place -> leave the existing file alone
+        if os.path.exists(file_path) and os.path.getsize(file_path) == size:
+            if await run_in_threadpool(file_sha256, file_path) == content_hash:
+                await aiofiles.os.remove(tmp_path)
+                return {
+                    "filename": filename,
+                    "folder": folder_name,
+                    "size": size,
+                    "sha256": content_hash,
+                    "image_type": image_type,
+                    "unchanged": True,
+                    "path": f"/uploads/{folder_name}/{filename}"
+                }
+
+        await aiofiles.os.replace(tmp_path, file_path)
+        # Write-through to the manifest index with the hash we already have
+        await run_in_threadpool(upsert_image, folder_name, filename, file_path, content_hash)
+        await refresh_variants(file_path, folder_name, filename)
+        # New images arrive alongside new claim rows; don't keep serving the old dashboard
+        invalidate_claim_queries()
+        return {
+            "filename": filename,
+            "folder": folder_name,
+            "size": size,
+            "sha256": content_hash,
+            "image_type": image_type,
+            "unchanged": False,
+            "path": f"/uploads/{folder_name}/{filename}"
+        }
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+########################## Batch / archive uploads ##########################
+
+async def iter_upload_files(files) -> AsyncIterator:
+    for file in files:
+        yield file.filename, iter_upload_file(file)
+
+
+class ArchiveLimitExceeded(HTTPException):
+    """An archive went past MAX_ARCHIVE_MEMBERS or MAX_BATCH_UPLOAD_BYTES unpacked; aborts the whole batch."""
+
+    def __init__(self, message: str):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail={"message": message})
+
+
+class _ArchiveBudget:
+    """Members and unpacked bytes left for one archive upload."""
+
+    def __init__(self):
+        self.members = 0
+        self.expanded = 0
+
+    def add_member(self) -> None:
+        self.members += 1
+        if self.members > MAX_ARCHIVE_MEMBERS:
+            raise ArchiveLimitExceeded(f"Archive has more than {MAX_ARCHIVE_MEMBERS} files")
+
+    def add_bytes(self, count: int) -> None:
+        self.expanded += count
+        if self.expanded > MAX_BATCH_UPLOAD_BYTES:
+            raise ArchiveLimitExceeded(f"Archive unpacks to more than {MAX_BATCH_UPLOAD_BYTES} bytes")
+
+
+async def _discard_saved(folder_name: str, results: list) -> None:
+    """Remove the files an aborted batch already wrote (files it found unchanged are left alone)."""
+    target_folder = folder_path(folder_name)
+    for result in results:
+        if result["status"] != "success" or result.get("unchanged"):
+            continue
+        file_path = os.path.join(target_folder, result["filename"])
+        if os.path.exists(file_path):
+            await aiofiles.os.remove(file_path)
+        await run_in_threadpool(remove_variants, folder_name, result["filename"])
+    invalidate_folder(folder_name)
+    await run_in_threadpool(reconcile_folder, folder_name)
+
+
+async def save_many(folder_name: str, items) -> dict:
+    """
+    Save an async iterable of (filename, chunk iterator) pairs into one claim folder.
+    One bad file does not abort the others; each gets its own result. An archive
+    over its limits (ArchiveLimitExceeded) aborts the batch and its files are removed.
+    """
+    safe_name(folder_name, "FolderName")
+    results = []
+    try:
+        async for filename, chunks in items:
+            try:
+                results.append({"status": "success", **await save_image_stream(folder_name, filename, chunks)})
+            except ArchiveLimitExceeded:
+                raise
+            except HTTPException as e:
+                results.append({"status": "error", "filename": filename, "code": e.status_code, "detail": e.detail})
+            except Exception as e:
+                results.append({"status": "error", "filename": filename, "code": 500, "detail": str(e)})
+    except ArchiveLimitExceeded:
+        if hasattr(items, "aclose"):
+            await items.aclose()
+        await _discard_saved(folder_name, results)
+        raise
+
+    return {
+        "folder": folder_name,
+        "saved": sum(1 for r in results if r["status"] == "success"),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "files": results,
+    }
+
+
+async def _iter_member(fileobj, budget: _ArchiveBudget) -> AsyncIterator[bytes]:
+    """Read an archive member in chunks off the event loop, counting them against the archive's budget."""
+    try:
+        while True:
+            chunk = await run_in_threadpool(fileobj.read, UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            budget.add_bytes(len(chunk))
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+async def iter_archive_members(archive: UploadFile):
+    """
+    Yield (filename, chunk iterator) for every regular file in a zip or tar(.gz)
+    upload. Members are unpacked one at a time straight into save_image_stream,
+    nothing is extracted to disk first. Directory parts of member names are dropped.
+    More than MAX_ARCHIVE_MEMBERS files, or more than MAX_BATCH_UPLOAD_BYTES
+    unpacked in total, raises ArchiveLimitExceeded (a small archive can expand
+    to a lot of disk).
+    """
+    source = archive.file
+    budget = _ArchiveBudget()
+    await run_in_threadpool(source.seek, 0)
+
+    if await run_in_threadpool(zipfile.is_zipfile, source):
+        await run_in_threadpool(source.seek, 0)
+        zf = await run_in_threadpool(zipfile.ZipFile, source)
+        try:
+            for info in zf.infolist():
+                if info.is_dir() or os.path.basename(info.filename).startswith("."):
+                    continue
+                budget.add_member()
+                member = await run_in_threadpool(zf.open, info)
+                yield os.path.basename(info.filename), _iter_member(member, budget)
+        finally:
+            zf.close()
+        return
+
+    await run_in_threadpool(source.seek, 0)
+    try:
+        # Stream mode: members are read sequentially, no seeking back
+        tf = await run_in_threadpool(tarfile.open, None, "r|*", source)
+    except tarfile.TarError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Archive must be a zip or tar file"}
+        )
+    try:
+        while True:
+            member = await run_in_threadpool(tf.next)
+            if member is None:
+                break
+            if not member.isfile() or os.path.basename(member.name).startswith("."):
+                continue
+            budget.add_member()
+            yield os.path.basename(member.name), _iter_member(tf.extractfile(member), budget)
+    finally:
+        tf.close()
+
+
+########################## Resumable chunked uploads ##########################
+
+# Session state lives next to the uploads so every worker sees it
+RESUMABLE_DIR = os.path.join(UPLOAD_DIR, ".resumable")
+try:
+    # Sessions with no chunk for this long are deleted
+    RESUMABLE_SESSION_TTL_SECONDS = int(os.environ.get("RESUMABLE_SESSION_TTL_SECONDS", 24 * 3600))
+except ValueError:
+    raise RuntimeError("RESUMABLE_SESSION_TTL_SECONDS must be an integer")
+# Expired sessions are swept at most this often, from create_upload_session
+RESUMABLE_CLEANUP_INTERVAL_SECONDS = 600
+
+_last_session_cleanup = 0.0
+
+
+def _session_paths(upload_id: str):
+    upload_id = safe_name(upload_id, "upload id")
+    return os.path.join(RESUMABLE_DIR, f"{upload_id}.json"), os.path.join(RESUMABLE_DIR, f"{upload_id}.part")
+
+
+def _read_session(upload_id: str) -> dict:
+    meta_path, part_path = _session_paths(upload_id)
+    if not os.path.exists(meta_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Upload session not found"}
+        )
+    with open(meta_path) as f:
+        session = json.load(f)
+    session["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return session
+
+
+def _lock_part_file(part_path: str):
+    """
+    Exclusive, non-blocking flock on the part file; None when another request
+    holds it. Works across workers, unlike an in-process lock.
+    """
+    try:
+        fd = os.open(part_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _unlock_part_file(fd: int) -> None:
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+def cleanup_upload_sessions(max_age: int = RESUMABLE_SESSION_TTL_SECONDS) -> int:
+    """Delete sessions whose last activity is older than `max_age` seconds. Returns how many."""
+    if not os.path.isdir(RESUMABLE_DIR):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.listdir(RESUMABLE_DIR):
+        if not entry.endswith(".json"):
+            continue
+        meta_path, part_path = _session_paths(entry[:-len(".json")])
+        try:
+            last_activity = max(os.path.getmtime(path) for path in (meta_path, part_path) if os.path.exists(path))
+        except ValueError:
+            continue
+        if last_activity >= cutoff:
+            continue
+        fd = _lock_part_file(part_path)
+        if fd is None and os.path.exists(part_path):
+            continue  # a chunk is being written right now
+        try:
+            for path in (meta_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            removed += 1
+        finally:
+            if fd is not None:
+                _unlock_part_file(fd)
+    return removed
+
+
+async def create_upload_session(folder_name: str, filename: str, size: int) -> dict:
+    """Start a resumable upload of `size` bytes. Returns the session with its upload_id."""
+    safe_name(folder_name, "FolderName")
+    safe_name(os.path.basename(filename or ""), "filename")
+    check_extension(filename)
+    if size <= 0 or size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail={"message": f"size must be between 1 and {MAX_UPLOAD_BYTES} bytes"}
+        )
+
+    await aiofiles.os.makedirs(RESUMABLE_DIR, exist_ok=True)
+
+    global _last_session_cleanup
+    if time.time() - _last_session_cleanup > RESUMABLE_CLEANUP_INTERVAL_SECONDS:
+        _last_session_cleanup = time.time()
+        await run_in_threadpool(cleanup_upload_sessions)
+
+    session = {
+        "upload_id": uuid.uuid4().hex,
+        "folder": folder_name,
+        "filename": os.path.basename(filename),
+        "size": size,
+        "created_at": time.time(),
+    }
+    meta_path, part_path = _session_paths(session["upload_id"])
+    async with aiofiles.open(meta_path, "w") as f:
+        await f.write(json.dumps(session))
+    async with aiofiles.open(part_path, "wb"):
+        pass
+    return {**session, "offset": 0}
+
+
+async def get_upload_session(upload_id: str) -> dict:
+    return await run_in_threadpool(_read_session, upload_id)
+
+
+async def append_upload_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    Append a chunk at `offset`. A client whose offset does not match the bytes
+    already received gets 409 with the server offset and resumes from there.
+    Chunks for one upload are serialised by a flock on the part file; a PUT
+    that arrives while another is still writing gets 409 as well.
+    When the last byte arrives the file is validated and moved into the claim folder.
+    """
+    meta_path, part_path = _session_paths(upload_id)
+    session = await get_upload_session(upload_id)
+    if not os.path.exists(part_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Upload session not found"}
+        )
+    fd = _lock_part_file(part_path)
+    if fd is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Another chunk for this upload is in progress", "offset": session["offset"]}
+        )
+
+    try:
+        # Re-read under the lock: the size may have moved since get_upload_session
+        session["offset"] = os.fstat(fd).st_size
+        if offset != session["offset"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "Offset mismatch", "offset": session["offset"]}
+            )
+
+        received = session["offset"]
+        async with aiofiles.open(part_path, "ab") as out:
+            async for chunk in chunks:
+                if received + len(chunk) > session["size"]:
+                    # The chunks before this one are kept; report what is on disk
+                    await out.flush()
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail={"message": "Chunk runs past the declared size", "offset": received}
+                    )
+                await out.write(chunk)
+                received += len(chunk)
+
+        if received < session["size"]:
+            return {**session, "offset": received, "complete": False}
+
+        # Complete: run the normal validated, atomic, idempotent save from the part file
+        async def part_chunks():
+            async with aiofiles.open(part_path, "rb") as f:
+                while True:
+                    chunk = await f.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        try:
+            saved = await save_image_stream(session["folder"], session["filename"], part_chunks())
+        finally:
+            for path in (meta_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        return {**session, "offset": received, "complete": True, **saved}
+    finally:
+        _unlock_part_file(fd)
@@ -3,93 +3,109 @@ User Controller Module
 '''
 
 from fastapi import status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
 
 # Database Modules
-from Database.database import get_db
+from Database.engine import AsyncSessionLocal
 from Database.models import User
 
 # Hashing and JWT Modules
-from Utils.auth import hash_password, check_password, create_access_token
+from Utils.auth import hash_password, check_password, needs_rehash, create_access_token, invalidate_principal
+from Utils.passwordPool import run_password_task
 
 
-def create_user_function(username: str, password: str) -> bool:
+async def create_user_function(username: str, password: str) -> bool:
     """
     Create a new user in the database.
     Returns True on success, False on failure.
+    Password hashing runs on the bounded password pool, never on the event loop.
     """
-    db_gen = get_db()
-    db: Session = next(db_gen)
-
-    try:
-        if not username or not password:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={"message": "Enter username and password"}
-            )
-
-        # Check if user already exists
-        existing = db.query(User).filter_by(name=username).first()
-        if existing:
-            # Prefer returning an error to the client; the route layer can translate this.
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail={"message": "Username already exists"}
-            )
-
-        # Hash the password (hash_password should raise/return valid string)
+    async with AsyncSessionLocal() as db:
         try:
-            hashed_password = hash_password(password)
+            if not username or not password:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={"message": "Enter username and password"}
+                )
+
+            # Check if user already exists
+            existing = (await db.execute(select(User).filter_by(name=username))).scalars().first()
+            if existing:
+                # Prefer returning an error to the client; the route layer can translate this.
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail={"message": "Username already exists"}
+                )
+
+            # Hash the password (hash_password should raise/return valid string)
+            try:
+                hashed_password = await run_password_task(hash_password, password)
+            except HTTPException:
+                # pool saturated -> 503
+                raise
+            except Exception as e:
+                # If hashing fails for some reason, surface a 500
+                print("Hashing error:", e)
+                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Password hashing failed")
+
+            # Create and persist user
+            new_user = User(name=username, password=hashed_password)
+            db.add(new_user)
+            await db.commit()
+            await db.refresh(new_user)
+
+            # Drop any stale principal cached under this name (e.g. a re-created user)
+            invalidate_principal(username)
+
+            # Success: return True (or return new_user if you prefer)
+            return True
+
+        except HTTPException:
+            # re-raise HTTPExceptions for route layer to handle
+            await db.rollback()
+            raise
+        except SQLAlchemyError as e:
+            await db.rollback()
+            print("DB Error creating user:", e)
+            # hide DB internals, return generic 500
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
         except Exception as e:
-            # If hashing fails for some reason, surface a 500
-            print("Hashing error:", e)
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Password hashing failed")
-
-        # Create and persist user
-        new_user = User(name=username, password=hashed_password)
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-
-        # Success: return True (or return new_user if you prefer)
-        return True
-
-    except HTTPException:
-        # re-raise HTTPExceptions for route layer to handle
-        db.rollback()
-        raise
-    except SQLAlchemyError as e:
-        db.rollback()
-        print("DB Error creating user:", e)
-        # hide DB internals, return generic 500
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+            await db.rollback()
+            print("Unexpected error creating user:", e)
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+async def rehash_user_password(db: AsyncSession, user: User, password: str) -> None:
+    """
+    Re-hash a verified password at the current BCRYPT_ROUNDS cost.
+    Failures are logged and ignored: the old hash still works.
+    """
+    try:
+        user.password = await run_password_task(hash_password, password)
+        await db.commit()
+        invalidate_principal(user.name)
     except Exception as e:
-        db.rollback()
-        print("Unexpected error creating user:", e)
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
-    finally:
-        db_gen.close()
+        await db.rollback()
+        print(f"Password rehash skipped for {user.name}: {e}")
 
 
-def verify_user_function(username: str, password: str) -> dict:
+async def verify_user_function(username: str, password: str) -> dict:
     """
     Verifies a user's credentials and returns a JWT access token dict:
     {"access_token": "<token>", "token_type": "bearer"} on success.
-    Raises HTTPException on failure.
+    Raises HTTPException on failure (503 when the password pool is saturated).
     """
-    db_gen = get_db()
-    db: Session = next(db_gen)
-
-    try:
+    async with AsyncSessionLocal() as db:
         if not username or not password:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "Username and password are required"}
             )
 
-        check_user: Optional[User] = db.query(User).filter_by(name=username).first()
+        check_user: Optional[User] = (await db.execute(select(User).filter_by(name=username))).scalars().first()
 
         if not check_user:
             raise HTTPException(
@@ -98,17 +114,18 @@ def verify_user_function(username: str, password: str) -> dict:
             )
 
         # check_password should return a boolean
-        if not check_password(password, check_user.password):
+        if not await run_password_task(check_password, password, check_user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={"message": "Invalid username or password"}
             )
 
+        # Stored hash made with an older cost -> upgrade it now that we have the plaintext
+        if needs_rehash(check_user.password):
+            await rehash_user_password(db, check_user, password)
+
         # Create JWT token. create_access_token should accept {"sub": username}
         data = {"sub": check_user.name}
         access_token = create_access_token(data)
 
         return {"access_token": access_token, "token_type": "bearer"}
-
-    finally:
-        db_gen.close()
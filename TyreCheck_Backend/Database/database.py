@@ -1,10 +1,22 @@
-from .engine import engine, Base, SessionLocal
+from .engine import engine, Base, SessionLocal, AsyncSessionLocal
+from .poolMetrics import timed_checkout, async_timed_checkout, sync_wait_stats, async_wait_stats
+
+from .migrations import DB_AUTO_MIGRATE, upgrade
 
 Base.metadata.create_all(bind=engine)
+if DB_AUTO_MIGRATE:
+    upgrade(engine)
 
 def get_db():
     db = SessionLocal()
     try:
+        timed_checkout(db, sync_wait_stats)
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        await async_timed_checkout(db, async_wait_stats)
+        yield db
@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from urllib.parse import quote
 from dotenv import load_dotenv
 load_dotenv()
@@ -11,12 +12,41 @@ db_password = quote(db_password)
 db_host = os.environ.get("DB_HOST")
 db_name = os.environ.get("DB_NAME")
 
+# Pool settings. Each engine (sync + async) gets its own pool of this size,
+# so one worker can hold up to 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+try:
+    db_pool_size = int(os.environ.get("DB_POOL_SIZE", 10))
+    db_max_overflow = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    db_pool_timeout = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    # Recycle below MySQL's wait_timeout so idle connections are never used after the server dropped them
+    db_pool_recycle = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+except ValueError:
+    raise RuntimeError("DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT and DB_POOL_RECYCLE must be integers")
+
+db_pool_pre_ping = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# SQL statement echo is only for local debugging
+db_debug = os.environ.get("DB_DEBUG", "false").lower() in ("1", "true", "yes")
+
+pool_options = {
+    "pool_size": db_pool_size,
+    "max_overflow": db_max_overflow,
+    "pool_timeout": db_pool_timeout,
+    "pool_recycle": db_pool_recycle,
+    "pool_pre_ping": db_pool_pre_ping,
+}
+
 
 
 url_link = f"mysql+pymysql://{db_username}:{db_password}@{db_host}/{db_name}"
+# Same database through the aiomysql driver, used by the async route layer
+async_url_link = f"mysql+aiomysql://{db_username}:{db_password}@{db_host}/{db_name}"
 
-engine = create_engine(url_link, echo=True)
+engine = create_engine(url_link, echo=db_debug, **pool_options)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=True)
 
-Base = declarative_base()
\ No newline at end of file
+async_engine = create_async_engine(async_url_link, echo=db_debug, **pool_options)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=True, expire_on_commit=False)
+
+Base = declarative_base()
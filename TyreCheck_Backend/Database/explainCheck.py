@@ -0,0 +1,109 @@
+'''
+EXPLAIN check for the hot TBL_Tyre_Details queries
+
+Runs EXPLAIN on the dashboard, view-claim and update lookups and fails when
+MySQL plans a full scan (access type ALL) of TBL_Tyre_Details. Stored
+procedures cannot be EXPLAINed, so each entry is the SELECT the route (or the
+SP behind it) issues. Run it against a copy of production data after
+`python -m Database.migrations upgrade`; on a near-empty table the optimizer
+may prefer a scan regardless of indexes.
+
+Usage:
+    python -m Database.explainCheck            # exit code 1 on a full scan
+    python -m Database.explainCheck --json
+'''
+
+import json
+import sys
+
+from sqlalchemy import text
+
+from .engine import engine
+
+
+SCANNED_TABLE = "TBL_Tyre_Details"
+
+HOT_QUERIES = {
+    # Routes/dashboardRoute.py count_claims with dealer, service type and dates
+    "dashboard_count": """
+        SELECT COUNT(DISTINCT Claim_Warranty_Id) AS total
+        FROM TBL_Tyre_Details sl
+        INNER JOIN tyre_dealer_masters tdm ON sl.Dealer_Code = tdm.Dealer_code
+        WHERE sl.Dealer_Code = :dealer AND sl.Service_type = :service_type
+          AND sl.Request_Date >= :from_dt AND sl.Request_Date <= :to_dt
+    """,
+    # Routes/dashboardRoute.py fetch_claims_keyset, date range only (default filters)
+    "dashboard_keyset": """
+        SELECT sl.Claim_Warranty_Id, MIN(sl.Request_Date) AS first_request
+        FROM TBL_Tyre_Details sl
+        INNER JOIN tyre_dealer_masters tdm ON sl.Dealer_Code = tdm.Dealer_code
+        WHERE sl.Request_Date >= :from_dt AND sl.Request_Date <= :to_dt
+        GROUP BY sl.Claim_Warranty_Id
+        ORDER BY first_request DESC, sl.Claim_Warranty_Id DESC
+        LIMIT 11
+    """,
+    # USP_GetTyreDetailsFromWarranty_ClaimNo (/viewClaim, /viewClaim/bundle)
+    "view_claim": """
+        SELECT * FROM TBL_Tyre_Details WHERE Claim_Warranty_Id = :claim_id
+    """,
+    # Routes/viewClaimRoutes.py update_claim_result(s) row lookup
+    "update_lookup": """
+        SELECT ID, Image_name FROM TBL_Tyre_Details
+        WHERE Claim_Warranty_Id = :claim_id AND Type = :type
+        ORDER BY ID LIMIT 1
+    """,
+}
+
+
+def sample_params(connection) -> dict:
+    """Parameter values taken from the newest row so the plans reflect real selectivity."""
+    row = connection.execute(text(
+        "SELECT Claim_Warranty_Id, Type, Dealer_Code, Service_type, Request_Date "
+        "FROM TBL_Tyre_Details ORDER BY ID DESC LIMIT 1"
+    )).first()
+    if row is None:
+        return {
+            "claim_id": "", "type": "", "dealer": "", "service_type": "claim",
+            "from_dt": "2024-01-01 00:00:00", "to_dt": "2024-01-31 23:59:59"
+        }
+    day = row.Request_Date.date() if row.Request_Date else None
+    return {
+        "claim_id": row.Claim_Warranty_Id,
+        "type": row.Type,
+        "dealer": row.Dealer_Code,
+        "service_type": row.Service_type,
+        "from_dt": f"{day} 00:00:00" if day else "2024-01-01 00:00:00",
+        "to_dt": f"{day} 23:59:59" if day else "2024-01-31 23:59:59",
+    }
+
+
+def explain_hot_queries(bind=engine) -> dict:
+    """
+    Returns {query_name: {"plan": [...], "full_scan": bool}}. `full_scan` is
+    set when any plan row reads TBL_Tyre_Details with access type ALL.
+    """
+    report = {}
+    with bind.connect() as connection:
+        params = sample_params(connection)
+        for name, sql in HOT_QUERIES.items():
+            result = connection.execute(text(f"EXPLAIN {sql}"), params)
+            plan = [dict(zip(result.keys(), row)) for row in result.fetchall()]
+            full_scan = any(
+                (step.get("type") or "").upper() == "ALL"
+                and step.get("table") in ("sl", SCANNED_TABLE)
+                for step in plan
+            )
+            report[name] = {"plan": plan, "full_scan": full_scan}
+    return report
+
+
+if __name__ == "__main__":
+    report = explain_hot_queries()
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        for name, entry in report.items():
+            print(f"{name:18} {'FULL SCAN' if entry['full_scan'] else 'ok'}")
+            for step in entry["plan"]:
+                print(f"    {step.get('table')}: type={step.get('type')} key={step.get('key')} rows={step.get('rows')}")
+    sys.exit(1 if any(entry["full_scan"] for entry in report.values()) else 0)
@@ -0,0 +1,162 @@
+'''
+Versioned schema migrations
+
+create_all only creates missing tables, it never changes an existing one, so
+anything added to a live table (indexes so far) goes through here. Each
+migration has a version number and is recorded in TBL_Schema_Migrations once
+applied. Steps check the live schema first, so re-running against a database
+that already has an index (created by hand or by create_all) is a no-op.
+
+Usage (upgrade is a deploy step; see docker-compose.yml):
+    python -m Database.migrations status
+    python -m Database.migrations upgrade
+'''
+
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+from .engine import engine
+
+
+# Off by default: migrations run once per deploy (`python -m Database.migrations upgrade`,
+# the `migrate` service in docker-compose.yml), not from every process that imports
+# Database.database. Set to true only for local development databases.
+DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+# Serialises concurrent upgrades (several uvicorn workers starting at once)
+MIGRATION_LOCK_NAME = "tyrecheck_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 60
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "TBL_Schema_Migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(250), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class CreateIndex:
+    """Migration step: CREATE INDEX unless an index with the same leading columns already exists."""
+
+    def __init__(self, table: str, name: str, columns: list):
+        self.table = table
+        self.name = name
+        self.columns = columns
+
+    def describe(self) -> str:
+        return f"index {self.name} on {self.table} ({', '.join(self.columns)})"
+
+    def is_applied(self, connection) -> bool:
+        inspector = inspect(connection)
+        if not inspector.has_table(self.table):
+            return True     # nothing to index; the table is not ours to create
+        for index in inspector.get_indexes(self.table):
+            if index["name"] == self.name:
+                return True
+            if index["column_names"][:len(self.columns)] == self.columns:
+                return True
+        return False
+
+    def apply(self, connection) -> None:
+        preparer = connection.dialect.identifier_preparer
+        columns = ", ".join(preparer.quote(column) for column in self.columns)
+        connection.execute(text(
+            f"CREATE INDEX {preparer.quote(self.name)} ON {preparer.quote(self.table)} ({columns})"
+        ))
+
+
+# (version, description, steps). Append only; never renumber or edit an applied entry.
+MIGRATIONS = [
+    (1, "Composite indexes for the claim list, claim view and tyre update lookups", [
+        # /claim/details, export and summary filters: dealer + service type + date range
+        CreateIndex("TBL_Tyre_Details", "ix_tyre_dealer_service_date", ["Dealer_Code", "Service_type", "Request_Date"]),
+        # /viewClaim, /viewClaim/bundle and /updateClaimResult(s): one claim, one tyre
+        CreateIndex("TBL_Tyre_Details", "ix_tyre_claim_type", ["Claim_Warranty_Id", "Type"]),
+        # Date-only ranges (default dashboard filters, exports without a dealer)
+        CreateIndex("TBL_Tyre_Details", "ix_tyre_request_date", ["Request_Date"]),
+    ]),
+    (2, "Dealer master lookup used by the claim list join", [
+        CreateIndex("tyre_dealer_masters", "ix_dealer_masters_code", ["Dealer_code"]),
+    ]),
+]
+
+
+def applied_versions(connection) -> set:
+    migration_metadata.create_all(bind=connection)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars().all())
+
+
+def pending_migrations(connection) -> list:
+    done = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration[0] not in done]
+
+
+def _acquire_lock(connection) -> bool:
+    if connection.dialect.name != "mysql":
+        return True
+    return connection.execute(
+        text("SELECT GET_LOCK(:name, :timeout)"),
+        {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}
+    ).scalar() == 1
+
+
+def _release_lock(connection) -> None:
+    if connection.dialect.name == "mysql":
+        connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+
+def upgrade(bind=engine) -> list:
+    """
+    Apply every pending migration in version order. Returns the versions applied.
+    MySQL DDL commits implicitly, so each step is checked before it runs rather
+    than relying on a rollback.
+    """
+    applied = []
+    with bind.connect() as connection:
+        if not _acquire_lock(connection):
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            for version, description, steps in pending_migrations(connection):
+                for step in steps:
+                    if step.is_applied(connection):
+                        print(f"Migration {version}: {step.describe()} already present, skipped")
+                        continue
+                    print(f"Migration {version}: creating {step.describe()}")
+                    step.apply(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+                connection.commit()
+                applied.append(version)
+        finally:
+            _release_lock(connection)
+            connection.commit()
+    return applied
+
+
+def status(bind=engine) -> list:
+    with bind.connect() as connection:
+        done = applied_versions(connection)
+        connection.commit()
+    return [
+        {"version": version, "description": description, "applied": version in done}
+        for version, description, _ in MIGRATIONS
+    ]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "upgrade":
+        print(f"Applied: {upgrade() or 'nothing, schema is current'}")
+    elif command == "status":
+        for entry in status():
+            print(f"{entry['version']:>4}  {'applied' if entry['applied'] else 'pending':8}  {entry['description']}")
+    else:
+        print("Usage: python -m Database.migrations [status|upgrade]")
+        sys.exit(2)
@@ -1,6 +1,6 @@
 from typing import List
 from sqlalchemy import ForeignKey
-from sqlalchemy import String, Column, Integer, DateTime
+from sqlalchemy import String, Column, Integer, DateTime, Date, BigInteger, Index
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
@@ -18,6 +18,12 @@ class User(Base):
 
 class ClaimWarranty(Base):
     __tablename__ = "TBL_Tyre_Details"
+    # Existing databases get these through Database/migrations.py (version 1)
+    __table_args__ = (
+        Index("ix_tyre_dealer_service_date", "Dealer_Code", "Service_type", "Request_Date"),
+        Index("ix_tyre_claim_type", "Claim_Warranty_Id", "Type"),
+        Index("ix_tyre_request_date", "Request_Date"),
+    )
 
     ID = Column(Integer, primary_key=True, autoincrement=True)
     Claim_Warranty_Id = Column(String(250), nullable=True)
@@ -54,4 +60,45 @@ class ClaimWarranty(Base):
     Extra1 = Column(String(20), nullable=True)
     Extra2 = Column(String(20), nullable=True)
     Extra3 = Column(String(20), nullable=True)
-    folder_name = Column(String(45), nullable=True)
\ No newline at end of file
+    folder_name = Column(String(45), nullable=True)
+
+class DealerMaster(Base):
+    """Dealer master joined by the claim list; maintained outside this service."""
+    __tablename__ = "tyre_dealer_masters"
+
+    Dealer_code = Column(String(150), primary_key=True)
+    Dealer_name = Column(String(250), nullable=True)
+
+
+class ClaimDailyRollup(Base):
+    """
+    Per-dealer, per-day, per-service-type, per-defect aggregates of TBL_Tyre_Details.
+    Maintained incrementally by Controllers.rollupController.
+    """
+    __tablename__ = "TBL_Claim_Daily_Rollup"
+
+    Dealer_Code = Column(String(150), primary_key=True)
+    Rollup_Date = Column(Date, primary_key=True)
+    Service_type = Column(String(150), primary_key=True)
+    Final_Defect = Column(String(45), primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+    # Claims are counted once, in the group of their first (lowest ID) row
+    claim_count = Column(Integer, nullable=False, default=0)
+    result_percentage_sum = Column(BigInteger, nullable=False, default=0)
+    result_percentage_count = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "TBL_Rollup_Watermark"
+
+    name = Column(String(100), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class RollupDirtyClaim(Base):
+    """Claims edited after they were folded into the rollups; re-folded by the next refresh."""
+    __tablename__ = "TBL_Rollup_Dirty_Claims"
+
+    Claim_Warranty_Id = Column(String(250), primary_key=True)
+    marked_at = Column(DateTime, nullable=True)
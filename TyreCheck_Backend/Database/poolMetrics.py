@@ -0,0 +1,66 @@
+'''
+Connection pool metrics for the sync and async engines
+'''
+
+import threading
+import time
+
+from .engine import engine, async_engine, pool_options
+
+
+class PoolWaitStats:
+    """Accumulates how long sessions waited to get a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "acquisitions": self.count,
+                "avg_wait_ms": round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+                "max_wait_ms": round(self.max_seconds * 1000, 3),
+            }
+
+
+sync_wait_stats = PoolWaitStats()
+async_wait_stats = PoolWaitStats()
+
+
+def timed_checkout(session, stats: PoolWaitStats) -> None:
+    """Check out the session's connection now and record the wait."""
+    started = time.perf_counter()
+    session.connection()
+    stats.record(time.perf_counter() - started)
+
+
+async def async_timed_checkout(session, stats: PoolWaitStats) -> None:
+    started = time.perf_counter()
+    await session.connection()
+    stats.record(time.perf_counter() - started)
+
+
+def _pool_counters(pool) -> dict:
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+def pool_status() -> dict:
+    return {
+        "config": pool_options,
+        "sync": {**_pool_counters(engine.pool), **sync_wait_stats.snapshot()},
+        "async": {**_pool_counters(async_engine.pool), **async_wait_stats.snapshot()},
+    }
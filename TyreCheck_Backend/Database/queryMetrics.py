@@ -0,0 +1,232 @@
+'''
+Per-route SQL timing
+
+Cursor-level events on both engines time every statement and attribute it to
+the FastAPI route that issued it (through a context variable set by the
+request middleware in main.py). Each route keeps histograms of total request
+time, time spent in the database and statements per request, plus one
+histogram per statement label (stored procedure name, or SELECT/INSERT/...).
+Statements slower than SLOW_QUERY_MS are logged with their parameter values
+redacted.
+'''
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+from .engine import engine, async_engine
+
+
+logger = logging.getLogger("tyrecheck.sql")
+
+try:
+    SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", 500))
+except ValueError:
+    raise RuntimeError("SLOW_QUERY_MS must be an integer")
+
+# Upper bounds in milliseconds; the last bucket catches everything above
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+# Statements issued outside a request (startup, background refreshers)
+BACKGROUND_ROUTE = "<background>"
+
+_CALL_RE = re.compile(r"^\s*CALL\s+(?:`?\w+`?\.)?`?(\w+)`?", re.IGNORECASE)
+_VERB_RE = re.compile(r"^\s*(\w+)")
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style) with count, sum and max."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 2),
+            "mean": round(self.sum / self.count, 2) if self.count else 0.0,
+            "max": round(self.max, 2),
+            "buckets": buckets,
+        }
+
+
+class RequestTiming:
+    """DB time accumulated by one request; shared by every task/thread the request spawns."""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.db_ms = 0.0
+        self.statements = 0
+        self._lock = threading.Lock()
+
+    def add(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.db_ms += elapsed_ms
+            self.statements += 1
+
+
+current_request: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def _route(self, route: str) -> dict:
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = {
+                "request_ms": Histogram(),
+                "db_ms": Histogram(),
+                "statements_per_request": Histogram(buckets=(1, 2, 5, 10, 25, 50, 100, float("inf"))),
+                "statements": {},
+            }
+        return entry
+
+    def record_statement(self, route: str, label: str, elapsed_ms: float, rowcount: int) -> None:
+        with self._lock:
+            statements = self._route(route)["statements"]
+            entry = statements.get(label)
+            if entry is None:
+                entry = statements[label] = {"duration_ms": Histogram(), "rows": 0}
+            entry["duration_ms"].observe(elapsed_ms)
+            if rowcount and rowcount > 0:
+                entry["rows"] += rowcount
+
+    def record_request(self, timing: RequestTiming, total_ms: float) -> None:
+        with self._lock:
+            entry = self._route(timing.route)
+            entry["request_ms"].observe(total_ms)
+            entry["db_ms"].observe(timing.db_ms)
+            entry["statements_per_request"].observe(timing.statements)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            report = {}
+            for route, entry in self._routes.items():
+                request_ms = entry["request_ms"].snapshot()
+                db_ms = entry["db_ms"].snapshot()
+                report[route] = {
+                    "request_ms": request_ms,
+                    "db_ms": db_ms,
+                    # Share of request time spent waiting on MySQL; the rest is Python (serialisation etc.)
+                    "db_share": round(db_ms["sum"] / request_ms["sum"], 4) if request_ms["sum"] else None,
+                    "statements_per_request": entry["statements_per_request"].snapshot(),
+                    "statements": {
+                        label: {"duration_ms": stats["duration_ms"].snapshot(), "rows": stats["rows"]}
+                        for label, stats in entry["statements"].items()
+                    },
+                }
+            return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+route_metrics = RouteMetrics()
+
+
+def route_template(request) -> str:
+    """
+    Path template of the route a request will hit ("/auth/viewClaim/Claim_ID={claim_id:path}"),
+    so claim IDs do not each get their own metrics entry.
+    """
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return f"{request.method} {getattr(route, 'path', request.url.path)}"
+    return f"{request.method} <unmatched>"
+
+
+def statement_label(statement: str) -> str:
+    """`CALL tyrecheck.USP_X(...)` -> 'USP_X', anything else -> its leading verb."""
+    match = _CALL_RE.match(statement)
+    if match:
+        return match.group(1)
+    match = _VERB_RE.match(statement)
+    return match.group(1).upper() if match else "UNKNOWN"
+
+
+def redact_parameters(parameters):
+    """Keep parameter names and types, drop the values (claim IDs, dealer codes, passwords)."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: show the first row's shape and how many rows there were
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+
+    timing = current_request.get()
+    route = timing.route if timing is not None else BACKGROUND_ROUTE
+    if timing is not None:
+        timing.add(elapsed_ms)
+
+    label = statement_label(statement)
+    rowcount = getattr(cursor, "rowcount", -1)
+    route_metrics.record_statement(route, label, elapsed_ms, rowcount)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1fms route=%s label=%s rows=%s params=%s sql=%s",
+            elapsed_ms, route, label, rowcount, redact_parameters(parameters),
+            " ".join(statement.split())[:500]
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument(target_engine) -> None:
+    event.listen(target_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target_engine, "handle_error", _handle_error)
+
+
+instrument(engine)
+instrument(async_engine.sync_engine)
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi.responses import StreamingResponse, FileResponse
+import os
+from datetime import date, datetime
 from Database.models import User, ClaimWarranty
 from Utils.auth import get_current_user
-from Database.database import get_db
+from Utils.streaming import stream_query_rows
+from Utils.keysetCursor import encode_cursor, decode_cursor
+from Utils.singleFlight import claim_list_flight, claim_total_cache
+from Utils.fastJson import TRUST_SP_OUTPUT, json_response, result_rows, rows_response
+from Controllers import coreQueries
+from Controllers.columnarController import COLUMNAR_FORMATS, export_watermark, stream_columnar
+from Controllers.exportController import create_export_job, get_export_job, public_job, artifact_path
+from Database.database import get_async_db
+from Database.engine import AsyncSessionLocal
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from Schemas.claimSchema import ClaimWarrantySPRequest, ClaimWarrantySPSchema, PaginatedClaimSPResponse, exportPDF
 from typing import Optional, List
 from pydantic import BaseModel
@@ -21,63 +32,166 @@ protected_dashboard_router = APIRouter(
 
 
 
-@protected_dashboard_router.post("/details", response_model=PaginatedClaimSPResponse)
-async def access_with_sp_paged_iso(
-    request: ClaimWarrantySPRequest,
-    per_page: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def build_claim_filters(request: ClaimWarrantySPRequest):
     """
-    Expects FromDate/ToDate in ISO yyyy-mm-dd (or null). Calls
-    USP_GetAllDetails_Paged which uses DATE(FromDate) safely.
+    Build the parameterized WHERE clause shared by the COUNT and keyset queries.
+    Returns (where_sql, params).
     """
-    try:
-        print("From Date --->", request.FromDate)
-        print("To Date --->", request.ToDate)
-        
-        print(request.ClaimWarrantyId, request.DealerId, request.Servicetype)
-        page = max(1, int(request.page or 1))
-
-        # Build WHERE clauses & params for COUNT query (parameterized)
-        where_clauses = []
-        params = {}
-
-        if request.ClaimWarrantyId:
-            where_clauses.append("Claim_Warranty_Id = :claim_id")
-            params["claim_id"] = request.ClaimWarrantyId
-
-        if request.DealerId:
-            where_clauses.append("sl.Dealer_Code = :dealer")
-            params["dealer"] = request.DealerId
-
-        if request.Servicetype:
-            where_clauses.append("sl.Service_type = :service_type")
-            params["service_type"] = request.Servicetype
-
-        # IMPORTANT: expect ISO dates here (yyyy-mm-dd). We expand ToDate to end-of-day.
-        if request.FromDate:
-            # compare Request_Date >= 'YYYY-MM-DD 00:00:00'
-            where_clauses.append("Request_Date >= :from_dt")
-            params["from_dt"] = f"{request.FromDate} 00:00:00"
-        if request.ToDate:
-            # compare Request_Date <= 'YYYY-MM-DD 23:59:59'
-            where_clauses.append("Request_Date <= :to_dt")
-            params["to_dt"] = f"{request.ToDate} 23:59:59"
-
-        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-
-        # 1) Fast COUNT (DISTINCT Claim_Warranty_Id to match SP grouping)
-        count_sql = text(
-            f"SELECT COUNT(DISTINCT Claim_Warranty_Id) as total "
-            f"FROM TBL_Tyre_Details sl "
-            f"INNER JOIN tyre_dealer_masters tdm ON sl.Dealer_Code = tdm.Dealer_code "
-            f"WHERE {where_sql}"
-        )
-        total = int(db.execute(count_sql, params).scalar() or 0)
-        total_pages = (total + per_page - 1) // per_page if per_page else 1
-
-        # 2) Call paged stored-proc (we pass the raw ISO dates - SP will do DATE(FromDate) as before)
+    where_clauses = []
+    params = {}
+
+    if request.ClaimWarrantyId:
+        where_clauses.append("sl.Claim_Warranty_Id = :claim_id")
+        params["claim_id"] = request.ClaimWarrantyId
+
+    if request.DealerId:
+        where_clauses.append("sl.Dealer_Code = :dealer")
+        params["dealer"] = request.DealerId
+
+    if request.Servicetype:
+        where_clauses.append("sl.Service_type = :service_type")
+        params["service_type"] = request.Servicetype
+
+    # IMPORTANT: expect ISO dates here (yyyy-mm-dd). We expand ToDate to end-of-day.
+    if request.FromDate:
+        # compare Request_Date >= 'YYYY-MM-DD 00:00:00'
+        where_clauses.append("sl.Request_Date >= :from_dt")
+        params["from_dt"] = f"{request.FromDate} 00:00:00"
+    if request.ToDate:
+        # compare Request_Date <= 'YYYY-MM-DD 23:59:59'
+        where_clauses.append("sl.Request_Date <= :to_dt")
+        params["to_dt"] = f"{request.ToDate} 23:59:59"
+
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+    return where_sql, params
+
+
+async def count_claims(db: AsyncSession, where_sql: str, params: dict) -> int:
+    """COUNT(DISTINCT Claim_Warranty_Id) for the filter set, served from claim_total_cache when fresh."""
+    cache_key = tuple(sorted(params.items()))
+    total = claim_total_cache.get(cache_key)
+    if total is not None:
+        return total
+
+    # COUNT (DISTINCT Claim_Warranty_Id to match SP grouping)
+    count_sql = text(
+        f"SELECT COUNT(DISTINCT Claim_Warranty_Id) as total "
+        f"FROM TBL_Tyre_Details sl "
+        f"INNER JOIN tyre_dealer_masters tdm ON sl.Dealer_Code = tdm.Dealer_code "
+        f"WHERE {where_sql}"
+    )
+    total = int((await db.execute(count_sql, params)).scalar() or 0)
+    claim_total_cache.set(cache_key, total)
+    return total
+
+
+async def fetch_claims_keyset(db: AsyncSession, where_sql: str, params: dict, after: Optional[str], per_page: int):
+    """
+    Keyset page of claims ordered newest first by their first Request_Date.
+    The page's claim IDs are picked in a derived table that only groups
+    (Claim_Warranty_Id, MIN(Request_Date)); the display aggregates
+    (TotalAVG, InspectionTime, ...) then run over every filtered row of just
+    those claims, so they match the offset path. Claims without any
+    Request_Date sort last (MySQL orders NULL lowest).
+    Returns (rows, next_cursor).
+    """
+    params = dict(params)
+    having_sql = ""
+    if after:
+        after_dt, after_id = decode_cursor(after)
+        if after_dt is None:
+            having_sql = "HAVING MIN(sl.Request_Date) IS NULL AND sl.Claim_Warranty_Id < :after_id"
+        else:
+            having_sql = (
+                "HAVING MIN(sl.Request_Date) < :after_dt "
+                "OR (MIN(sl.Request_Date) = :after_dt AND sl.Claim_Warranty_Id < :after_id) "
+                "OR MIN(sl.Request_Date) IS NULL"
+            )
+            params["after_dt"] = after_dt
+        params["after_id"] = after_id
+
+    # Same row shape as USP_GetAllDetails_Paged (ClaimWarrantySPSchema)
+    keyset_sql = text(
+        f"SELECT sl.Claim_Warranty_Id, "
+        f"COALESCE(MAX(tdm.Dealer_name), '') AS Dealer_name, "
+        f"COALESCE(MAX(sl.Service_type), '') AS Service_type, "
+        f"page.first_request AS first_request, "
+        f"DATE_FORMAT(MIN(sl.Request_Date), '%d/%m/%Y %H:%i') AS CreatedDate, "
+        f"COALESCE(CAST(ROUND(AVG(sl.Result_percentage), 2) AS CHAR), '') AS TotalAVG, "
+        f"CONCAT(TIMESTAMPDIFF(MINUTE, MIN(sl.Request_Date), MAX(sl.Request_Date)), ' minutes ', "
+        f"MOD(TIMESTAMPDIFF(SECOND, MIN(sl.Request_Date), MAX(sl.Request_Date)), 60), ' seconds') AS InspectionTime, "
+        f"sl.Claim_Warranty_Id AS `View` "
+        f"FROM ("
+        f"  SELECT sl.Claim_Warranty_Id, MIN(sl.Request_Date) AS first_request "
+        f"  FROM TBL_Tyre_Details sl "
+        f"  INNER JOIN tyre_dealer_masters tdm ON sl.Dealer_Code = tdm.Dealer_code "
+        f"  WHERE {where_sql} "
+        f"  GROUP BY sl.Claim_Warranty_Id "
+        f"  {having_sql} "
+        f"  ORDER BY first_request DESC, sl.Claim_Warranty_Id DESC "
+        f"  LIMIT :limit"
+        f") page "
+        f"INNER JOIN TBL_Tyre_Details sl ON sl.Claim_Warranty_Id = page.Claim_Warranty_Id "
+        f"INNER JOIN tyre_dealer_masters tdm ON sl.Dealer_Code = tdm.Dealer_code "
+        f"WHERE {where_sql} "
+        f"GROUP BY sl.Claim_Warranty_Id, page.first_request "
+        f"ORDER BY page.first_request DESC, sl.Claim_Warranty_Id DESC"
+    )
+    # Fetch one extra row to know whether another page exists
+    params["limit"] = per_page + 1
+    rows = [dict(r) for r in (await db.execute(keyset_sql, params)).mappings().all()]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["first_request"], last["Claim_Warranty_Id"])
+
+    for row in rows:
+        row.pop("first_request", None)
+    return rows, next_cursor
+
+
+async def load_claim_page(request: ClaimWarrantySPRequest, page: int, per_page: int, paging: str, after: Optional[str], include_total: bool) -> dict:
+    """
+    One /details page on its own session. Runs under claim_list_flight, so it
+    may be shared by several identical requests and outlive the one that started it.
+    """
+    where_sql, params = build_claim_filters(request)
+
+    async with AsyncSessionLocal() as db:
+        total = None
+        total_pages = None
+        if include_total:
+            total = await count_claims(db, where_sql, params)
+            total_pages = (total + per_page - 1) // per_page if per_page else 1
+
+        if paging == "cursor":
+            data, next_cursor = await fetch_claims_keyset(db, where_sql, params, after, per_page)
+            return {
+                "data": data,
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "total_pages": total_pages,
+                "next_cursor": next_cursor
+            }
+
+        if coreQueries.use_core("claim_details"):
+            data = await coreQueries.claim_page(
+                db, page, per_page,
+                claim_id=request.ClaimWarrantyId, dealer=request.DealerId, service_type=request.Servicetype,
+                from_date=request.FromDate, to_date=request.ToDate
+            )
+            return {
+                "data": data,
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "total_pages": total_pages
+            }
+
+        # Call paged stored-proc (we pass the raw ISO dates - SP will do DATE(FromDate) as before)
         call_sql = text(
             "CALL USP_GetAllDetails_Paged(:ClaimWarrantyId, :DealerId, :Servicetype, :FromDate, :ToDate, :p_page, :p_per_page)"
         )
@@ -93,7 +207,7 @@ async def access_with_sp_paged_iso(
             "p_per_page": per_page
         }
 
-        res = db.execute(call_sql, sp_params)
+        res = await db.execute(call_sql, sp_params)
 
         # get rows as dicts. Use mappings() if available.
         try:
@@ -104,20 +218,57 @@ async def access_with_sp_paged_iso(
             rows_list = res.fetchall() if res.returns_rows else []
             data = [dict(zip(keys, row)) for row in rows_list]
 
-        return {
-            "data": data,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages
-        }
+    return {
+        "data": data,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "total_pages": total_pages
+    }
+
+
+@protected_dashboard_router.post("/details", response_model=PaginatedClaimSPResponse)
+async def access_with_sp_paged_iso(
+    request: ClaimWarrantySPRequest,
+    per_page: int = Query(10, ge=1, le=100),
+    paging: str = Query("offset", pattern="^(offset|cursor)$"),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page (paging=cursor)"),
+    include_total: bool = Query(True),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Expects FromDate/ToDate in ISO yyyy-mm-dd (or null).
+    paging=offset (default) calls USP_GetAllDetails_Paged which uses DATE(FromDate) safely.
+    paging=cursor walks claims with an opaque `after` cursor so deep pages cost the same as page 1.
+    The filter-keyed total is cached briefly and skipped entirely with include_total=false.
+    Concurrent requests for the same page and filters share one DB execution.
+    """
+    try:
+        print("From Date --->", request.FromDate)
+        print("To Date --->", request.ToDate)
+        
+        print(request.ClaimWarrantyId, request.DealerId, request.Servicetype)
+        page = max(1, int(request.page or 1))
+
+        # Normalised so "" and null filters coalesce onto the same flight
+        flight_key = (
+            request.ClaimWarrantyId or None, request.DealerId or None, request.Servicetype or None,
+            request.FromDate or None, request.ToDate or None,
+            page, per_page, paging, after if paging == "cursor" else None, include_total
+        )
+        result = await claim_list_flight.run(
+            flight_key,
+            lambda: load_claim_page(request, page, per_page, paging, after, include_total)
+        )
+        if TRUST_SP_OUTPUT:
+            # Skip PaginatedClaimSPResponse validation; the SP shape is trusted as-is
+            return json_response(result)
+        return result
 
+    except HTTPException:
+        raise
     except Exception as exc:
         logger.exception("Error in paged SP endpoint (ISO-date variant)")
-        try:
-            db.rollback()
-        except Exception:
-            pass
         # return a slightly more helpful message for dev; remove `str(exc)` in production
         raise HTTPException(status_code=500, detail=f"Server error while fetching paged data: {str(exc)}")
 
@@ -131,7 +282,15 @@ async def access_with_sp_paged_iso(
 
 
 @protected_dashboard_router.post("/export_pdf")
-async def export_pdf_route(export_model: exportPDF, db: Session = Depends(get_db)):
+async def export_pdf_route(
+    export_model: exportPDF,
+    shape: str = Query("records", pattern="^(records|columns)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    shape=records (default) returns a list of row objects; shape=columns returns
+    {"columns": [...], "rows": [[...], ...]}, which is much cheaper for large ranges.
+    """
     try:
         print("From date -->", export_model.fromDate)
         print("To date -->", export_model.toDate)
@@ -144,16 +303,21 @@ async def export_pdf_route(export_model: exportPDF, db: Session = Depends(get_db
         from_date = export_model.fromDate or None
         to_date = export_model.toDate or None
 
+        if coreQueries.use_core("export_report"):
+            # Unfiltered requests keep the 10-row cap, applied in SQL here
+            limit = None if any([claim_id, dealer_code, from_date, to_date]) else 10
+            result = await db.execute(coreQueries.claim_report_query(claim_id, from_date, to_date, dealer_code, limit))
+            columns, rows = result_rows(result)
+            return rows_response(columns, rows, shape)
+
         # If all filters are None, fetch all (optionally limit for safety)
         if not any([claim_id, dealer_code, from_date, to_date]):
-            result = db.execute(
+            result = await db.execute(
                 text("CALL tyrecheck.usp_getTyreReportFiltered(NULL, NULL, NULL, NULL)")
             )
-            rows = result.fetchall()
-            columns = result.keys()
             # Optional: limit rows to first 10
-            response = [dict(zip(columns, row)) for row in rows[:10]]
-            return response
+            columns, rows = result_rows(result, limit=10)
+            return rows_response(columns, rows, shape)
 
         # Call stored procedure with filters
         sql = text("""
@@ -165,19 +329,139 @@ async def export_pdf_route(export_model: exportPDF, db: Session = Depends(get_db
             )
         """)
 
-        result = db.execute(sql, {
+        result = await db.execute(sql, {
             "p_claim": claim_id,
             "p_FromDate": from_date,
             "p_ToDate": to_date,
             "p_dealer": dealer_code
         })
 
-        rows = result.fetchall()
-        columns = result.keys()
-        response = [dict(zip(columns, row)) for row in rows]
-
-        return response
+        columns, rows = result_rows(result)
+        return rows_response(columns, rows, shape)
 
     except Exception as e:
         print(f"Export PDF Route Error: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+
+report_sql = text("""
+    CALL tyrecheck.usp_getTyreReportFiltered(
+        :p_claim,
+        :p_FromDate,
+        :p_ToDate,
+        :p_dealer
+    )
+""")
+
+
+@protected_dashboard_router.post("/export_stream")
+async def export_stream_route(
+    export_model: exportPDF,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """
+    Streams the same rows as /export_pdf as NDJSON or CSV, chunk by chunk,
+    so memory stays flat however wide the date range is.
+    """
+    params = {
+        "p_claim": export_model.claim_id or None,
+        "p_FromDate": export_model.fromDate or None,
+        "p_ToDate": export_model.toDate or None,
+        "p_dealer": export_model.dealer_code or None
+    }
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"claim_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    if coreQueries.use_core("export_report"):
+        query = coreQueries.claim_report_query(
+            params["p_claim"], params["p_FromDate"], params["p_ToDate"], params["p_dealer"]
+        )
+        rows = stream_query_rows(query, {}, export_format)
+    else:
+        rows = stream_query_rows(report_sql, params, export_format)
+
+    return StreamingResponse(
+        rows,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+
+
+@protected_dashboard_router.get("/export_columnar")
+async def export_columnar_route(
+    export_format: str = Query("parquet", alias="format", pattern="^(arrow|parquet)$"),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    dealer_code: Optional[str] = Query(None),
+    service_type: Optional[str] = Query(None),
+    after_id: int = Query(0, ge=0, description="X-Export-Watermark of the previous pull"),
+    max_rows: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Streams TBL_Tyre_Details rows as typed Arrow IPC (format=arrow) or Parquet
+    record batches, in ID order. For incremental pulls pass the previous
+    response's X-Export-Watermark as after_id; max_rows caps one pull.
+    """
+    filters = {
+        "dealer": dealer_code or None,
+        "service_type": service_type or None,
+        "from_date": from_date,
+        "to_date": to_date
+    }
+    watermark = await export_watermark(db, after_id, max_rows, filters)
+
+    media_type, extension = COLUMNAR_FORMATS[export_format]
+    filename = f"claim_details_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    return StreamingResponse(
+        stream_columnar(export_format, after_id, watermark, filters),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-After": str(after_id),
+            # Nothing newer: hand back after_id so the next pull starts from the same place
+            "X-Export-Watermark": str(watermark if watermark is not None else after_id)
+        }
+    )
+
+
+
+
+@protected_dashboard_router.post("/export_jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job_route(export_model: exportPDF):
+    """
+    Queue a server-side PDF render for the exportPDF filters.
+    Poll GET /export_jobs/{job_id} and download once status is "done".
+    """
+    job = await create_export_job(export_model.model_dump())
+    return public_job(job)
+
+
+@protected_dashboard_router.get("/export_jobs/{job_id}")
+async def export_job_status_route(job_id: str):
+    return public_job(get_export_job(job_id))
+
+
+@protected_dashboard_router.get("/export_jobs/{job_id}/download")
+async def export_job_download_route(job_id: str):
+    job = get_export_job(job_id)
+    if job["status"] != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": f"Export job is {job['status']}"}
+        )
+
+    path = artifact_path(job["fingerprint"])
+    if not os.path.exists(path):
+        # Superseded by a newer export of the same range, or aged out by cleanup_exports
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail={"message": "Export artifact expired, create a new export job"}
+        )
+
+    return FileResponse(path, media_type="application/pdf", filename=f"claim_report_{job_id}.pdf")
@@ -1,8 +1,7 @@
-from fastapi import FastAPI, HTTPException, status, Depends, APIRouter
-from Database.database import get_db
+from fastapi import FastAPI, HTTPException, status, Depends, APIRouter, Request, Response
 from Utils.auth import get_current_user
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from Utils.fileServing import etag_matches
+from Controllers.dealerController import load_dealers, invalidate_dealers, dealer_cache, DEALER_CACHE_TTL_SECONDS
 
 
 
@@ -20,17 +19,34 @@ protected_dealer_route = APIRouter(
 
 
 @protected_dealer_route.get("")
-async def get_all_dealers(db: Session = Depends(get_db)):
+async def get_all_dealers(request: Request, response: Response):
+    """
+    Dealer master list from the in-process cache. Browsers revalidate with
+    If-None-Match and get a 304 while the list is unchanged; the ETag comes
+    back weak (W/) when CompressionMiddleware encoded the body, which still
+    matches here.
+    """
     try:
-        result = db.execute(text("CALL tyrecheck.GetAllDealers()"))
-        
-        rows = result.fetchall()
-        columns = result.keys()
-        
-        # Convert to list of dicts
-        response = [dict(zip(columns, row)) for row in rows]
-        
-        return response
+        dealers = await load_dealers()
+        headers = {
+            "ETag": dealers["etag"],
+            # private: the list sits behind a bearer token
+            "Cache-Control": f"private, max-age={DEALER_CACHE_TTL_SECONDS}, must-revalidate",
+        }
+
+        if etag_matches(request.headers.get("if-none-match", ""), dealers["etag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(dealers["body"], headers=headers, media_type="application/json")
     except Exception as e:
         print(f"Get Dealers Route Error: {e}")
         raise e
+
+
+
+
+@protected_dealer_route.post("/invalidate")
+async def invalidate_dealers_route():
+    """Drop the cached dealer list after master data changes."""
+    invalidate_dealers()
+    return {"message": "Dealer cache cleared", "stats": dealer_cache.stats()}
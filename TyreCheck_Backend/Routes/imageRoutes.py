@@ -0,0 +1,85 @@
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from Utils.auth import get_image_user, get_current_user
+from Utils.fileServing import serve_file, is_immutable_name
+from Utils.imageVariants import VARIANT_FORMATS, snap_width, ensure_variant
+from Utils.manifestIndex import images_for_folder, images_by_type
+from Utils.uploads import folder_path, safe_name
+
+
+# Replaces the old StaticFiles mount at the same URL so existing image links keep working.
+# Token comes from the bearer header or the login cookie (see get_image_user).
+image_router = APIRouter(
+    prefix="/protected_claim/images",
+    tags=["Claim Image Routes"],
+    dependencies=[Depends(get_image_user)]
+)
+
+
+
+
+@image_router.get("/{folder}/{filename}")
+async def claim_image(
+    folder: str,
+    filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, description="Return a resized variant at least this wide"),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$")
+):
+    """
+    Original claim image, or with ?w= a cached resized variant (WebP when the
+    browser accepts it, JPEG otherwise). Variants render on first request and
+    are re-rendered automatically when the source file changes.
+    UUID-named uploads are cached as immutable; everything carries a strong
+    ETag and supports If-None-Match and byte ranges.
+    """
+    source_path = os.path.join(folder_path(folder), safe_name(filename, "filename"))
+    if not os.path.isfile(source_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Image not found"}
+        )
+
+    immutable = is_immutable_name(filename)
+    if w is None:
+        return serve_file(request, source_path, immutable=immutable)
+
+    fmt = format or ("webp" if "image/webp" in request.headers.get("accept", "") else "jpeg")
+    try:
+        path = await run_in_threadpool(ensure_variant, source_path, folder, filename, snap_width(w), fmt)
+    except Exception as e:
+        print(f"Image Variant Route Error: {e}")
+        # Fall back to the original rather than a broken image
+        return serve_file(request, source_path, immutable=immutable)
+
+    # Variants follow their source: same immutability, re-rendered only if the source changes
+    return serve_file(request, path, media_type=VARIANT_FORMATS[fmt][1], immutable=immutable,
+                      extra_headers={"Vary": "Accept"})
+
+
+
+
+# Lookups against the persistent manifest index (Utils/manifestIndex.py).
+# Reconciling it walks the whole volume, so that is CLI-only: python -m Utils.manifestIndex [--full]
+protected_image_index_route = APIRouter(
+    prefix="/images",
+    tags=["Claim Image Index Routes"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+
+
+@protected_image_index_route.get("/folder/{folder}")
+async def indexed_folder_images(folder: str, image_type: Optional[str] = Query(None, pattern="^(raw|defect|gauge|other)$")):
+    safe_name(folder, "FolderName")
+    return await run_in_threadpool(images_for_folder, folder, image_type)
+
+
+@protected_image_index_route.get("/type/{image_type}")
+async def indexed_images_by_type(image_type: str, limit: int = Query(1000, ge=1, le=10000)):
+    return await run_in_threadpool(images_by_type, image_type, limit)
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends
+from Utils.auth import get_current_user, principal_cache
+from Database.poolMetrics import pool_status
+from Database.queryMetrics import route_metrics, SLOW_QUERY_MS
+from Utils.passwordPool import password_pool_stats
+from Utils.singleFlight import single_flight_stats
+from Controllers.coreQueries import backend_config
+
+
+
+
+protected_metrics_route = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics Routes"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+
+
+@protected_metrics_route.get("/principal_cache")
+async def principal_cache_stats():
+    """Hit/miss counters for the auth principal cache."""
+    return principal_cache.stats()
+
+
+
+@protected_metrics_route.get("/db_pool")
+async def db_pool_stats():
+    """Live pool counters and connection wait times for both engines."""
+    return pool_status()
+
+
+
+@protected_metrics_route.get("/password_pool")
+async def password_pool_route():
+    """In-flight, completed and rejected (503) bcrypt jobs."""
+    return password_pool_stats()
+
+
+
+
+@protected_metrics_route.get("/single_flight")
+async def single_flight_route():
+    """DB executions vs coalesced requests for the dashboard and summary queries."""
+    return single_flight_stats()
+
+
+
+@protected_metrics_route.get("/query_backend")
+async def query_backend_route():
+    """Which routes run on stored procedures ("sp") and which on Controllers/coreQueries.py ("core")."""
+    return backend_config()
+
+
+
+@protected_metrics_route.get("/db_time")
+async def db_time_route():
+    """
+    Per-route histograms (ms) of request time, DB time and statements per
+    request, plus per-statement (stored procedure) timings and row counts.
+    db_share close to 1 means MySQL is the bottleneck; close to 0 means Python is.
+    """
+    return {"slow_query_ms": SLOW_QUERY_MS, "routes": route_metrics.snapshot()}
+
+
+
+@protected_metrics_route.post("/db_time/reset")
+async def reset_db_time_route():
+    route_metrics.reset()
+    return {"message": "DB timing metrics reset"}
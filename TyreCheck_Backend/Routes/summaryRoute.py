@@ -1,9 +1,24 @@
-from fastapi import FastAPI, HTTPException, status, Depends, APIRouter
-from Database.database import get_db
+from fastapi import FastAPI, HTTPException, status, Depends, APIRouter, Response
+from fastapi.responses import StreamingResponse
+from Database.database import get_async_db
+from Database.engine import AsyncSessionLocal
 from Schemas.claimSchema import *
 from Utils.auth import get_current_user
-from sqlalchemy.orm import Session
+from Utils.streaming import stream_query_rows
+from Utils.singleFlight import summary_flight
+from Controllers import coreQueries
+from Utils.fastJson import json_response, result_rows
+from Controllers.rollupController import (
+    SUMMARY_SOURCE, summary_from_rollups, defect_summary_from_rollups,
+    check_consistency
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+import asyncio
+import logging
+import os
+import time
+logger = logging.getLogger(__name__)
 
 
 
@@ -64,9 +79,65 @@ def normalize(value):
     return value
 
 
-@protected_summary_route.post("/summary_report")
-async def summary_report(filters: SummaryFilter, db: Session = Depends(get_db)):
+async def run_summary_procedure(sql, params: dict):
+    """
+    Run one summary SP on its own pooled connection so the two reports can
+    execute concurrently. Returns (rows, elapsed_ms).
+    """
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(sql, params)
+        rows = [dict(zip(result.keys(), row)) for row in result.fetchall()]
+    return rows, round((time.perf_counter() - started) * 1000, 2)
+
+
+async def load_summary_report(servicetype: str, dealer, from_date, to_date) -> dict:
+    """
+    Both SPs are dispatched at once, so latency is the slower of the two
+    rather than their sum. Returns the report plus the per-procedure timings.
+    """
+    # Unset filters bind as NULL, same as the default SP call
+    sql1 = text("""
+        CALL tyrecheck.USP_DashboardServicetypewise_percentage_Report(
+            :servicetype, :dealer, :from_date, :to_date
+        )
+    """)
+
+    sql2 = text("""
+        CALL tyrecheck.USP_DashboardServicetypewiseCountReport(
+            :servicetype, :dealer, :from_date, :to_date
+        )
+    """)
+
+    params = {
+        "servicetype": servicetype,
+        "dealer": dealer,
+        "from_date": from_date,
+        "to_date": to_date,
+    }
+
+    started = time.perf_counter()
+    (percentage_report, percentage_ms), (overall_summary, overall_ms) = await asyncio.gather(
+        run_summary_procedure(sql1, params),
+        run_summary_procedure(sql2, params),
+    )
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    return {
+        "report": {
+            "percentage_report": percentage_report,
+            "overall_summary": overall_summary
+        },
+        "timings": {"percentage_report": percentage_ms, "overall_summary": overall_ms, "summary_total": total_ms}
+    }
 
+
+@protected_summary_route.post("/summary_report")
+async def summary_report(filters: SummaryFilter, response: Response):
+    """
+    Concurrent requests with the same filters share one execution of the SP
+    pair (Utils/singleFlight.py). Per-procedure timings go out in Server-Timing.
+    """
     try:
         print("Dealer Code ->>>", filters.dealer_code)
         # print("Dealer Name ->>>", filters)
@@ -75,51 +146,22 @@ async def summary_report(filters: SummaryFilter, db: Session = Depends(get_db)):
         from_date = normalize(filters.from_date)
         to_date = normalize(filters.to_date)
 
-        # If user gives nothing → default SP call
-        if not dealer and not from_date and not to_date:
-            sql1 = text("""
-                CALL tyrecheck.USP_DashboardServicetypewise_percentage_Report(:servicetype, NULL, NULL, NULL)
-            """)
-            sql2 = text("""
-                CALL tyrecheck.USP_DashboardServicetypewiseCountReport(:servicetype, NULL, NULL, NULL)
-            """)
-        else:
-            sql1 = text("""
-                CALL tyrecheck.USP_DashboardServicetypewise_percentage_Report(
-                    :servicetype, :dealer, :from_date, :to_date
-                )
-            """)
-
-            sql2 = text("""
-                CALL tyrecheck.USP_DashboardServicetypewiseCountReport(
-                    :servicetype, :dealer, :from_date, :to_date
-                )
-            """)
-
-        result1 = db.execute(sql1, {
-            "servicetype": servicetype,
-            "dealer": dealer,
-            "from_date": from_date,
-            "to_date": to_date,
-        })
+        flight_key = (SUMMARY_SOURCE, servicetype, dealer, from_date, to_date)
 
-        rows1 = result1.fetchall()
-        percentage_report = [dict(zip(result1.keys(), row)) for row in rows1]
+        if SUMMARY_SOURCE == "rollup":
+            return await summary_flight.run(
+                flight_key, lambda: summary_from_rollups(servicetype, dealer, from_date, to_date)
+            )
 
-        result2 = db.execute(sql2, {
-            "servicetype": servicetype,
-            "dealer": dealer,
-            "from_date": from_date,
-            "to_date": to_date,
-        })
+        result = await summary_flight.run(
+            flight_key, lambda: load_summary_report(servicetype, dealer, from_date, to_date)
+        )
 
-        rows2 = result2.fetchall()
-        overall_summary = [dict(zip(result2.keys(), row)) for row in rows2]
+        timings = result["timings"]
+        response.headers["Server-Timing"] = ", ".join(f"{name};dur={ms}" for name, ms in timings.items())
+        logger.debug("Summary Report SP timings -> %s", response.headers["Server-Timing"])
 
-        return {
-            "percentage_report": percentage_report,
-            "overall_summary": overall_summary
-        }
+        return result["report"]
 
     except Exception as e:
         print("Summary Report Error:", e)
@@ -127,68 +169,118 @@ async def summary_report(filters: SummaryFilter, db: Session = Depends(get_db)):
     
     
     
+try:
+    AI_SUMMARY_DEFAULT_LIMIT = int(os.environ.get("AI_SUMMARY_DEFAULT_LIMIT", 500))
+    # Upper bound for top_list, also the ceiling for stream=true
+    AI_SUMMARY_MAX_ROWS = int(os.environ.get("AI_SUMMARY_MAX_ROWS", 90000))
+except ValueError:
+    raise RuntimeError("AI_SUMMARY_DEFAULT_LIMIT and AI_SUMMARY_MAX_ROWS must be integers")
+
+claim_summary_sql = text("""
+    call tyrecheck.usp_get_claimsummary(
+        :dealer_id,
+        :service_type,
+        :fromDate,
+        :toDate,
+        :top_list,
+        :defect_name
+    )
+""")
+
+
+def core_summary_params(params: dict) -> dict:
+    """usp_get_claimsummary parameters renamed for coreQueries.claim_summary_query."""
+    return {
+        "dealer_id": params["dealer_id"],
+        "service_type": params["service_type"],
+        "from_date": params["fromDate"],
+        "to_date": params["toDate"],
+        "top_list": params["top_list"],
+        "defect_name": params["defect_name"],
+    }
+
+
 @protected_summary_route.post("/ai_summary")
-async def ai_summary_route(summary_model: ai_summary ,db: Session = Depends(get_db)):
+async def ai_summary_route(summary_model: ai_summary, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """
+    Paged defect summary. Dealer and date filters go straight into the query;
+    the rollup and core backends apply the page's LIMIT/OFFSET in SQL (the SP
+    still reads the rows before the page). stream=true returns every row
+    (up to AI_SUMMARY_MAX_ROWS) as NDJSON instead.
+    Paging info is returned in X-Page / X-Limit / X-Has-More headers.
+    """
     try:
-        
-        if summary_model.dealer_id:
-            sql = text("""
-            call tyrecheck.usp_get_claimsummary(
-                :dealer_id,
-                :service_type,
-                :fromDate,
-                :toDate,
-                :top_list,
-                :defect_name
+        dealer_id = normalize(summary_model.dealer_id)
+        from_date = normalize(summary_model.fromDate)
+        to_date = normalize(summary_model.toDate)
+        page = summary_model.page
+        # A single dealer keeps its old top-10 default
+        limit = summary_model.limit or (10 if dealer_id else AI_SUMMARY_DEFAULT_LIMIT)
+        offset = (page - 1) * limit
+
+        params = {
+            "dealer_id": dealer_id,
+            "service_type": summary_model.service_type,
+            "fromDate": from_date,
+            "toDate": to_date,
+            "top_list": AI_SUMMARY_MAX_ROWS,
+            "defect_name": None        # not filtering by defect name
+        }
+
+        core = coreQueries.use_core("ai_summary")
+
+        if summary_model.stream:
+            return StreamingResponse(
+                stream_query_rows(
+                    coreQueries.claim_summary_query(**core_summary_params(params)) if core else claim_summary_sql,
+                    {} if core else params
+                ),
+                media_type="application/x-ndjson"
             )
-        """)
-
-            query = db.execute(sql, {
-                "dealer_id": summary_model.dealer_id,
-                "service_type": summary_model.service_type,
-                "fromDate": None,          # not filtering by date
-                "toDate": None,            # not filtering by date
-                "top_list": 10,            # default value
-                "defect_name": None        # not filtering by defect name
-            })
-            
-            rows = query.fetchall()
-            
-            columns = query.keys()
 
+        # Fetch one row past the page to know whether another page exists
+        page_rows = max(0, min(limit + 1, AI_SUMMARY_MAX_ROWS - offset))
+        if page_rows == 0:
+            result = []
+        elif SUMMARY_SOURCE == "rollup":
+            result = await defect_summary_from_rollups(
+                summary_model.service_type, dealer_id, from_date, to_date, limit=page_rows, offset=offset
+            )
+        elif core:
+            params["top_list"] = page_rows
+            query = await db.execute(coreQueries.claim_summary_query(**core_summary_params(params), offset=offset))
+            columns, rows = result_rows(query)
+            result = [dict(zip(columns, row)) for row in rows]
+        else:
+            # usp_get_claimsummary has no offset parameter: the rows before the page
+            # are still read (and skipped) here. Deep paging is cheap on ai_summary=core.
+            params["top_list"] = offset + page_rows
+            query = await db.execute(claim_summary_sql, params)
+            if offset:
+                query.fetchmany(offset)
+            columns, rows = result_rows(query)
             result = [dict(zip(columns, row)) for row in rows]
 
-            return result
-        
-        if not summary_model.dealer_id:
-            sql2 = text("""
-                call tyrecheck.usp_get_claimsummary(
-                    :dealer_id,
-                    :service_type,
-                    :fromDate,
-                    :toDate,
-                    :top_list,
-                    :defect_name
-                )
-            """)
-
-            query2 = db.execute(sql2, {
-                "dealer_id": None,
-                "service_type": summary_model.service_type,
-                "fromDate": None,
-                "toDate": None,
-                "top_list": 90000,
-                "defect_name": None
-            })
-
-            query2_rows = query2.fetchall()
-            query2_columns = query2.keys()
-
-            result2 = [dict(zip(query2_columns, row)) for row in query2_rows]
-
-            return result2
-            
-            
+        has_more = len(result) > limit
+        return json_response(result[:limit], headers={
+            "X-Page": str(page),
+            "X-Limit": str(limit),
+            "X-Has-More": "true" if has_more else "false",
+        })
+
     except Exception as e:
         print(f"Get AI Summary Route Error: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+
+
+@protected_summary_route.post("/rollups/consistency")
+async def rollup_consistency_route(filters: SummaryFilter):
+    """Compare rollup-backed numbers with the summary SPs for the given filters."""
+    return await check_consistency(
+        normalize(filters.servicetype) or "claim",
+        normalize(filters.dealer_code),
+        normalize(filters.from_date),
+        normalize(filters.to_date)
+    )
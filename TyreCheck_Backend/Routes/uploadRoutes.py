@@ -0,0 +1,54 @@
+from fastapi import APIRouter, File, Form, Query, Request, UploadFile, HTTPException, status
+from typing import List
+from pydantic import BaseModel
+
+from Controllers.uploadController import (
+    save_many, iter_upload_files, iter_archive_members,
+    create_upload_session, get_upload_session, append_upload_chunk
+)
+
+
+# Same access rules as /upload-image: called by the field capture app
+upload_router = APIRouter(tags=["Upload Routes"])
+
+
+class UploadSessionRequest(BaseModel):
+    FolderName: str
+    filename: str
+    size: int
+
+
+
+
+@upload_router.post("/upload-images")
+async def upload_images(files: List[UploadFile] = File(...), FolderName: str = Form()):
+    """All images of one claim in a single multipart request; per-file results."""
+    return await save_many(FolderName, iter_upload_files(files))
+
+
+@upload_router.post("/upload-archive")
+async def upload_archive(archive: UploadFile = File(...), FolderName: str = Form()):
+    """A zip or tar(.gz) of a claim's images, unpacked member by member into FolderName."""
+    return await save_many(FolderName, iter_archive_members(archive))
+
+
+
+
+@upload_router.post("/upload-sessions", status_code=status.HTTP_201_CREATED)
+async def create_upload_session_route(body: UploadSessionRequest):
+    """
+    Start a resumable upload. Send the bytes with PUT /upload-sessions/{upload_id}?offset=N,
+    check progress with GET, and resume from the returned offset after a dropped connection.
+    """
+    return await create_upload_session(body.FolderName, body.filename, body.size)
+
+
+@upload_router.get("/upload-sessions/{upload_id}")
+async def get_upload_session_route(upload_id: str):
+    return await get_upload_session(upload_id)
+
+
+@upload_router.put("/upload-sessions/{upload_id}")
+async def append_upload_chunk_route(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Raw request body is appended at `offset`; 409 returns the server's offset."""
+    return await append_upload_chunk(upload_id, offset, request.stream())
@@ -1,5 +1,5 @@
 # routes/user_routes.py
-from fastapi import APIRouter, status, HTTPException, Depends
+from fastapi import APIRouter, status, HTTPException, Depends, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -8,7 +8,7 @@ from Controllers.userController import create_user_function, verify_user_functio
 # Schemas
 from Schemas.userSchema import Create_User, Token
 # Auth dependency to get current user (from your auth file)
-from Utils.auth import get_current_user
+from Utils.auth import get_current_user, ACCESS_TOKEN_COOKIE, ACCESS_TOKEN_EXPIRE_MINUTES
 from Database.models import User
 
 # Public router: signup & login (no token required)
@@ -22,7 +22,7 @@ async def create_user_service(credentials: Create_User):
             detail={"message": "Please provide username and password"}
         )
 
-    created = create_user_function(credentials.username, credentials.password)
+    created = await create_user_function(credentials.username, credentials.password)
     if not created:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -32,7 +32,7 @@ async def create_user_service(credentials: Create_User):
 
 
 @public_user_router.post("/user_login", response_model=Token)
-async def user_login_service(form_data: OAuth2PasswordRequestForm = Depends()):
+async def user_login_service(response: Response, form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username
     password = form_data.password
 
@@ -42,11 +42,20 @@ async def user_login_service(form_data: OAuth2PasswordRequestForm = Depends()):
             detail={"message": "Please provide username and password"}
         )
 
-    token_response = verify_user_function(username, password)
+    token_response = await verify_user_function(username, password)
     if not token_response:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"message": "Invalid username or password"}
         )
+
+    # Same token as an httponly cookie, used by <img> requests for claim images
+    response.set_cookie(
+        ACCESS_TOKEN_COOKIE,
+        token_response["access_token"],
+        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        httponly=True,
+        samesite="lax"
+    )
     return token_response
 
@@ -1,15 +1,27 @@
-from Database.database import get_db
+from Database.database import get_async_db
 from Database.models import ClaimWarranty
 from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select, and_, or_
+from typing import List
 from Utils.auth import get_current_user
+import asyncio
 import logging
+from starlette.concurrency import run_in_threadpool
+from Controllers.dealerController import get_dealer_name_map
+from Utils.imageManifest import get_folder_manifest
 from Schemas.claimSchema import UpdateClaim
+from Utils.singleFlight import invalidate_claim_queries
+from Controllers import coreQueries
+from Controllers.rollupController import mark_claim_dirty
+from Utils.fastJson import json_response, result_rows, rows_response
 
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for /updateClaimResults (a claim has a handful of tyres plus the gauge)
+MAX_BULK_UPDATES = 50
+
 
 protected_claimView_route = APIRouter(
     prefix="/viewClaim",
@@ -20,7 +32,7 @@ protected_claimView_route = APIRouter(
 
 
 @protected_claimView_route.get("/Claim_ID={claim_id:path}")
-async def claimViewRoute(claim_id: str, db: Session = Depends(get_db)):
+async def claimViewRoute(claim_id: str, db: AsyncSession = Depends(get_async_db)):
 
     if not claim_id:
         raise HTTPException(
@@ -29,34 +41,116 @@ async def claimViewRoute(claim_id: str, db: Session = Depends(get_db)):
         )
 
     # Call stored procedure to get claim details
-    sql = text("CALL tyrecheck.USP_GetTyreDetailsFromWarranty_ClaimNo(:claim_id)")
-    result = db.execute(sql, {"claim_id": claim_id})
-    data = result.fetchall()
-    columns = result.keys()
-
-    # Convert SQL rows to list of dicts
-    response = [dict(zip(columns, row)) for row in data]
+    if coreQueries.use_core("view_claim"):
+        result = await db.execute(coreQueries.claim_details_query(claim_id))
+    else:
+        sql = text("CALL tyrecheck.USP_GetTyreDetailsFromWarranty_ClaimNo(:claim_id)")
+        result = await db.execute(sql, {"claim_id": claim_id})
+    columns, data = result_rows(result)
 
     # Optional: check if any data returned
-    if not response:
+    if not data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": f"No records found for Claim ID {claim_id}"}
         )
 
-    return response
+    return rows_response(columns, data)
+
+
+
+
+@protected_claimView_route.get("/bundle/Claim_ID={claim_id:path}")
+async def claimBundleRoute(claim_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Everything the ViewClaim page needs in one response: the tyre rows from
+    USP_GetTyreDetailsFromWarranty_ClaimNo, the dealer name, and the image
+    manifest (size, dimensions, sha256, variant URLs) of each claim folder.
+    Manifests come from the per-folder cache, not a fresh directory listing.
+    """
+    if not claim_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Claim ID Record not found"}
+        )
+
+    if coreQueries.use_core("view_claim"):
+        result = await db.execute(coreQueries.claim_details_query(claim_id))
+    else:
+        sql = text("CALL tyrecheck.USP_GetTyreDetailsFromWarranty_ClaimNo(:claim_id)")
+        result = await db.execute(sql, {"claim_id": claim_id})
+    columns = result.keys()
+    rows = [dict(zip(columns, row)) for row in result.fetchall()]
+
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": f"No records found for Claim ID {claim_id}"}
+        )
+
+    folders = sorted({row["folder_name"] for row in rows if row.get("folder_name")})
+    manifests = await asyncio.gather(*(run_in_threadpool(get_folder_manifest, folder) for folder in folders))
+    images = dict(zip(folders, manifests))
+
+    # Attach each row's own image entry so the client needs no lookups
+    for row in rows:
+        by_name = {entry["name"]: entry for entry in images.get(row.get("folder_name"), [])}
+        row["image"] = by_name.get(row.get("Image_name"))
 
+    dealer_code = next((row.get("Dealer_Code") for row in rows if row.get("Dealer_Code")), None)
+    dealer_names = await get_dealer_name_map()
 
+    return json_response({
+        "claim_id": claim_id,
+        "dealer_code": dealer_code,
+        "dealer_name": dealer_names.get(dealer_code),
+        "rows": rows,
+        "images": images
+    })
+
+
+
+
+update_tyre_sql = text("""
+    call tyrecheck.USP_UpdateTyreDetails(
+        :claimid, :remark, :imgName, :update_id, :correctvalue, :result_percentage
+    )
+""")
+
+
+async def run_tyre_update(db: AsyncSession, update_claim: UpdateClaim, image_name: str, update_id: int) -> None:
+    """USP_UpdateTyreDetails, or its Core equivalent when update_claim runs on the core backend."""
+    await mark_claim_dirty(db, update_claim.claim_id)
+    if coreQueries.use_core("update_claim"):
+        # Only fields the client sent; the rest of the row is left alone
+        changes = {
+            field: getattr(update_claim, field)
+            for field in coreQueries.UPDATE_TYRE_FIELDS if field in update_claim.model_fields_set
+        }
+        await coreQueries.update_tyre_details(db, update_claim.claim_id, update_id, **changes)
+        return
+
+    await db.execute(update_tyre_sql, {
+        "claimid": update_claim.claim_id,
+        "remark": update_claim.remark,
+        "imgName": image_name,
+        "update_id": update_id,
+        "correctvalue": update_claim.corrected_value,
+        "result_percentage": update_claim.result_percentage
+    })
 
 
 @protected_claimView_route.post("/updateClaimResult")
-async def update_claim_result(update_claim: UpdateClaim, db: Session = Depends(get_db)):
+async def update_claim_result(update_claim: UpdateClaim, db: AsyncSession = Depends(get_async_db)):
     try:
         
-        claim = db.query(ClaimWarranty).filter(
-            ClaimWarranty.Claim_Warranty_Id == update_claim.claim_id,
-            ClaimWarranty.Type == update_claim.type
-        ).first()
+        claim_result = await db.execute(
+            select(ClaimWarranty).filter(
+                ClaimWarranty.Claim_Warranty_Id == update_claim.claim_id,
+                ClaimWarranty.Type == update_claim.type
+            )
+        )
+        claim = claim_result.scalars().first()
 
         if not claim:
             raise HTTPException(status_code=404, detail="Claim not found")
@@ -64,25 +158,73 @@ async def update_claim_result(update_claim: UpdateClaim, db: Session = Depends(g
         claim_update_id = claim.ID
         claim_image_name = claim.Image_name
 
-        sql = text("""
-            call tyrecheck.USP_UpdateTyreDetails(
-                :claimid, :remark, :imgName, :update_id, :correctvalue, :result_percentage
-            )
-        """)
-
-        query = db.execute(sql, {
-            "claimid": update_claim.claim_id,
-            "remark": update_claim.remark,
-            "imgName": claim_image_name,
-            "update_id": claim_update_id,
-            "correctvalue": update_claim.corrected_value,
-            "result_percentage": update_claim.result_percentage
-        })
-
-        db.commit()
+        await run_tyre_update(db, update_claim, claim_image_name, claim_update_id)
+
+        await db.commit()
+        invalidate_claim_queries()
         return {"message": "Data Updated Successfully"}
             
         
     except Exception as e:
         print(f"Update Claim Route Error: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+
+@protected_claimView_route.post("/updateClaimResults")
+async def update_claim_results(updates: List[UpdateClaim], db: AsyncSession = Depends(get_async_db)):
+    """
+    Bulk version of /updateClaimResult for a reviewer correcting several tyres
+    at once. ID/Image_name for every item are resolved with one query, the
+    updates run in one transaction (a savepoint per item, so one failure does
+    not undo the rest) and are committed once. Returns a result per item.
+    """
+    if not updates:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"message": "No updates given"})
+    if len(updates) > MAX_BULK_UPDATES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": f"At most {MAX_BULK_UPDATES} updates per request"}
+        )
+
+    try:
+        keys = {(item.claim_id, item.type) for item in updates}
+        lookup = await db.execute(
+            select(ClaimWarranty.ID, ClaimWarranty.Image_name, ClaimWarranty.Claim_Warranty_Id, ClaimWarranty.Type)
+            .filter(or_(*(
+                and_(ClaimWarranty.Claim_Warranty_Id == claim_id, ClaimWarranty.Type == tyre_type)
+                for claim_id, tyre_type in keys
+            )))
+            .order_by(ClaimWarranty.ID)
+        )
+        # First (lowest ID) row per (claim, type), same row the single update picks
+        resolved = {}
+        for row in lookup.all():
+            resolved.setdefault((row.Claim_Warranty_Id, row.Type), row)
+
+        results = []
+        for index, item in enumerate(updates):
+            target = resolved.get((item.claim_id, item.type))
+            if target is None:
+                results.append({"index": index, "claim_id": item.claim_id, "type": item.type, "status": "not_found"})
+                continue
+            try:
+                async with db.begin_nested():
+                    await run_tyre_update(db, item, target.Image_name, target.ID)
+                results.append({"index": index, "claim_id": item.claim_id, "type": item.type, "id": target.ID, "status": "updated"})
+            except Exception as e:
+                print(f"Bulk Update Claim Item Error ({item.claim_id}/{item.type}): {e}")
+                results.append({"index": index, "claim_id": item.claim_id, "type": item.type, "status": "error", "detail": str(e)})
+
+        await db.commit()
+        invalidate_claim_queries()
+        return {
+            "updated": sum(1 for r in results if r["status"] == "updated"),
+            "failed": sum(1 for r in results if r["status"] != "updated"),
+            "results": results
+        }
+
+    except Exception as e:
+        await db.rollback()
+        print(f"Bulk Update Claim Route Error: {e}")
+        raise HTTPException(status_code=500, detail="Error updating claim results")
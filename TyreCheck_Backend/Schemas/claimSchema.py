@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import date
 
@@ -26,8 +26,9 @@ class PaginatedClaimSPResponse(BaseModel):
     data: List[ClaimWarrantySPSchema]
     page: int
     per_page: int
-    total: int
-    total_pages: int
+    total: Optional[int] = None        # None when include_total=false
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # only set for paging=cursor
     
     
     
@@ -76,6 +77,9 @@ class ai_summary(BaseModel):
     service_type : str = "claim"
     fromDate : Optional[str] = None
     toDate : Optional[str] = None
+    page : int = Field(1, ge=1)
+    limit : Optional[int] = Field(None, ge=1, le=5000)  # default: 10 for one dealer, AI_SUMMARY_DEFAULT_LIMIT otherwise
+    stream : bool = False  # NDJSON of every row instead of one page
     
     
     
@@ -1,9 +1,10 @@
 import os
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 import bcrypt
+import uuid
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from jose import jwt, JWTError
@@ -11,6 +12,7 @@ from sqlalchemy.orm import Session
 
 from Database.database import get_db
 from Database.models import User
+from Utils.cache import TTLCache
 
 # Environment variables
 load_dotenv()
@@ -31,6 +33,19 @@ else:
 if not SECRET_KEY or not ALGORITHM:
     raise RuntimeError("SECRET_KEY and ALGORITHM must be set in the environment")
 
+# Principal cache settings (seconds / entries)
+try:
+    PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", 300))
+    PRINCIPAL_CACHE_MAX_SIZE = int(os.environ.get("PRINCIPAL_CACHE_MAX_SIZE", 1024))
+except ValueError:
+    raise RuntimeError("PRINCIPAL_CACHE_TTL_SECONDS and PRINCIPAL_CACHE_MAX_SIZE must be integers")
+
+# bcrypt cost; stored hashes with a different cost are re-hashed on the next successful login
+try:
+    BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+except ValueError:
+    raise RuntimeError("BCRYPT_ROUNDS must be an integer")
+
 ##################### Password Encrypting and Checking ######################
 
 def hash_password(password: str) -> str:
@@ -41,7 +56,7 @@ def hash_password(password: str) -> str:
     if not password:
         raise ValueError("Password must be provided")
 
-    salt = bcrypt.gensalt(rounds=12)  # 12 is a reasonable default cost
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     encoded_password = password.encode("utf-8")
     hashed_password_bytes = bcrypt.hashpw(encoded_password, salt)
     # decode to store as string in DB (bcrypt output is ASCII-compatible)
@@ -69,6 +84,21 @@ def check_password(password: str, hashed_password: Optional[str]) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def needs_rehash(hashed_password: Optional[str]) -> bool:
+    """
+    True when a stored bcrypt hash was made with a cost other than BCRYPT_ROUNDS.
+    bcrypt hashes look like $2b$12$<salt+hash>, the second field is the cost.
+    """
+    if not hashed_password:
+        return False
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode("utf-8")
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
 ####################### JWT ACCESS TOKEN LOGIC ################################
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/user_login")
@@ -83,20 +113,39 @@ def create_access_token(data: dict, expires_delta_minutes: Optional[int] = None)
     minutes = expires_delta_minutes if (expires_delta_minutes is not None) else ACCESS_TOKEN_EXPIRE_MINUTES
     expire = datetime.utcnow() + timedelta(minutes=minutes)
     to_encode.update({"exp": expire})
+    # jti gives every token its own principal-cache slot
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+####################### PRINCIPAL CACHE ################################
+
+# Keyed by (username, jti) so a user with several live tokens gets one slot per token.
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(username: str) -> int:
     """
-    FastAPI dependency to retrieve the current user from the JWT token.
-    Use in routes as: current_user: User = Depends(get_current_user)
+    Drop every cached principal for `username`.
+    Call this whenever a user row is created, updated or deleted.
+    """
+    return principal_cache.invalidate_where(lambda key: key[0] == username)
+
+
+def resolve_user(token: Optional[str]) -> User:
+    """
+    Validate a JWT and return its User.
+    The user row is served from `principal_cache` and only loaded from the
+    database on a miss.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -106,8 +155,49 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter_by(name=username).first()
+    # Tokens issued before jti was added fall back to the token itself
+    cache_key = (username, payload.get("jti") or token)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    db_gen = get_db()
+    db: Session = next(db_gen)
+    try:
+        user = db.query(User).filter_by(name=username).first()
+    finally:
+        # Closing the session detaches the (already loaded) row so it can be shared
+        db_gen.close()
+
     if user is None:
         raise credentials_exception
 
+    principal_cache.set(cache_key, user)
     return user
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """
+    FastAPI dependency to retrieve the current user from the JWT token.
+    Use in routes as: current_user: User = Depends(get_current_user)
+    """
+    return resolve_user(token)
+
+
+# Cookie set by /auth/user/user_login so <img> requests carry the token
+ACCESS_TOKEN_COOKIE = "access_token"
+
+
+def get_image_user(request: Request) -> User:
+    """
+    Same check as get_current_user for resources the browser loads itself
+    (<img src>), which cannot send an Authorization header. Accepts the bearer
+    header or the access_token cookie; never a query parameter, which would
+    put the token in access logs, Referer headers and browser history.
+    """
+    token = None
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    token = token or request.cookies.get(ACCESS_TOKEN_COOKIE)
+    return resolve_user(token)
@@ -0,0 +1,186 @@
+'''
+Response compression negotiated by Accept-Encoding and size
+
+Brotli when the client accepts it and the Brotli package is installed, gzip
+otherwise. Small bodies (under COMPRESS_MIN_BYTES) and already-compressed
+content (images, PDFs, archives) go out as they are. Streamed bodies
+(NDJSON/CSV exports) are compressed chunk by chunk and flushed after each
+chunk, so they still reach the client incrementally.
+
+A strong ETag on an encoded response is made weak (W/"..."): the route
+computed it over the identity bytes, and a strong validator must not be
+shared by differently encoded bodies. If-None-Match uses weak comparison, so
+revalidation keeps working.
+'''
+
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from starlette.datastructures import Headers, MutableHeaders
+
+
+try:
+    COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+    GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+    # Brotli quality 4-5 is close to gzip -6 in CPU and noticeably smaller for JSON
+    BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+except ValueError:
+    raise RuntimeError("COMPRESS_MIN_BYTES, GZIP_LEVEL and BROTLI_QUALITY must be integers")
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+def _accepted_codings(accept_encoding: str) -> dict:
+    """Accept-Encoding -> {coding: q}; a q that does not parse counts as 0."""
+    codings = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding.lower()] = q
+    return codings
+
+
+def choose_encoding(accept_encoding: str):
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    if brotli is not None and codings.get("br", wildcard) > 0:
+        return "br"
+    if codings.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def _weaken_etag(headers: MutableHeaders) -> None:
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware, so streamed responses are not buffered."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, stream, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held until the first body chunk shows whether compression is worth it
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                _weaken_etag(headers)
+                if not more_body:
+                    body = compress_body(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                # Streamed: length unknown up front
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                stream = _BrotliStream() if encoding == "br" else _GzipStream()
+                await send(start_message)
+                start_message = None
+
+            if more_body:
+                await send({"type": "http.response.body", "body": stream.chunk(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": stream.chunk(body) + stream.finish()})
+
+        await self.app(scope, receive, compressing_send)
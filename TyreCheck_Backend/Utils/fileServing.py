@@ -0,0 +1,135 @@
+'''
+File responses with validators, conditional GET, byte ranges and immutable caching
+'''
+
+import mimetypes
+import os
+import re
+from typing import Optional
+
+import aiofiles
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from Utils.uploads import UPLOAD_CHUNK_BYTES
+
+# Upload names embed a UUID (defect-inside_25dde529-f079-...jpg); such files are never rewritten in place
+UUID_NAME = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_immutable_name(filename: str) -> bool:
+    return bool(UUID_NAME.search(filename))
+
+
+def file_etag(stat_result) -> str:
+    """
+    Strong validator from inode, size and mtime in ns. Uploads are written to a
+    temp file and renamed into place, so any content change changes all three.
+    """
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match check with weak comparison (W/ prefixes ignored), as RFC 9110 requires for it."""
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+# _parse_range result for a well-formed range that lies outside the file
+_UNSATISFIABLE = "unsatisfiable"
+
+
+def _parse_range(header: str, size: int):
+    """
+    Single byte range -> (start, end) inclusive; _UNSATISFIABLE when it lies
+    outside the file; None when serve_file should not answer it itself
+    (malformed, or several ranges) and leaves it to FileResponse.
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if start == "" and end == "":
+        return None
+    if size == 0:
+        return _UNSATISFIABLE
+    if start == "":
+        # suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            return _UNSATISFIABLE
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        return _UNSATISFIABLE
+    return start, min(int(end) if end else size - 1, size - 1)
+
+
+async def _iter_slice(path: str, start: int, length: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(UPLOAD_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request: Request, path: str, media_type: Optional[str] = None,
+               immutable: bool = False, extra_headers: Optional[dict] = None) -> Response:
+    """
+    Serve `path` with a strong ETag and Cache-Control.
+    - If-None-Match matching the ETag -> 304
+    - a single Range (honouring If-Range) -> 206, or 416 when unsatisfiable;
+      malformed and multi-range headers go to FileResponse as they are
+    - otherwise a FileResponse, which servers supporting the pathsend extension
+      hand to sendfile() without copying through Python
+    """
+    stat_result = os.stat(path)
+    etag = file_etag(stat_result)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        **(extra_headers or {}),
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range needs a strong match; a weak or stale validator gets the whole file
+    byte_range = None
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, stat_result.st_size)
+    if byte_range is not None:
+        if byte_range == _UNSATISFIABLE:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{stat_result.st_size}"}
+            )
+        start, end = byte_range
+        length = end - start + 1
+        return StreamingResponse(
+            _iter_slice(path, start, length),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type or mimetypes.guess_type(path)[0] or "application/octet-stream",
+            headers={
+                **headers,
+                "Content-Range": f"bytes {start}-{end}/{stat_result.st_size}",
+                "Content-Length": str(length),
+            }
+        )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
@@ -0,0 +1,68 @@
+'''
+Cached per-folder manifest of claim images in UPLOAD_DIR
+'''
+
+import os
+
+from Utils.cache import TTLCache
+from Utils.imageVariants import VARIANT_WIDTHS
+from Utils.manifestIndex import images_for_folder, reconcile_folder, folder_scanned_mtime
+from Utils.uploads import folder_path
+
+try:
+    FOLDER_MANIFEST_CACHE_SIZE = int(os.environ.get("FOLDER_MANIFEST_CACHE_SIZE", 2048))
+except ValueError:
+    raise RuntimeError("FOLDER_MANIFEST_CACHE_SIZE must be an integer")
+
+# folder -> {"dir_mtime_ns": ..., "files": [entry, ...]}
+# The directory mtime changes whenever a file is added, removed or renamed into place,
+# so one stat() tells us whether the cached listing is still valid.
+folder_manifests = TTLCache(maxsize=FOLDER_MANIFEST_CACHE_SIZE, ttl=24 * 3600)
+
+IMAGE_URL_PREFIX = "/protected_claim/images"
+
+
+def image_urls(folder: str, name: str) -> dict:
+    url = f"{IMAGE_URL_PREFIX}/{folder}/{name}"
+    return {"url": url, "variants": {str(w): f"{url}?w={w}" for w in VARIANT_WIDTHS}}
+
+
+def get_folder_manifest(folder: str) -> list:
+    """
+    Manifest entries for every image in a claim folder, read from the
+    persistent manifest index (Utils/manifestIndex.py). Blocking: call through
+    run_in_threadpool. The folder is only rescanned when its directory mtime
+    differs from the last indexed scan.
+    """
+    try:
+        dir_mtime_ns = os.stat(folder_path(folder)).st_mtime_ns
+    except FileNotFoundError:
+        return []
+
+    cached = folder_manifests.get(folder)
+    if cached is not None and cached["dir_mtime_ns"] == dir_mtime_ns:
+        return cached["files"]
+
+    if folder_scanned_mtime(folder) != dir_mtime_ns:
+        reconcile_folder(folder)
+
+    files = [
+        {
+            "name": row["name"],
+            "image_type": row["image_type"],
+            "position": row["position"],
+            "size": row["size"],
+            "mtime_ns": row["mtime_ns"],
+            "width": row["width"],
+            "height": row["height"],
+            "sha256": row["sha256"],
+            **image_urls(folder, row["name"]),
+        }
+        for row in images_for_folder(folder)
+    ]
+    folder_manifests.set(folder, {"dir_mtime_ns": dir_mtime_ns, "files": files})
+    return files
+
+
+def invalidate_folder(folder: str) -> None:
+    folder_manifests.invalidate(folder)
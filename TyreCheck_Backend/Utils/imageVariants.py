@@ -0,0 +1,80 @@
+'''
+Derived image variants (thumbnails / medium sizes) for claim images
+'''
+
+import os
+import uuid
+
+from PIL import Image, ImageOps
+
+from Utils.uploads import UPLOAD_DIR
+
+# Widths we are willing to render; requested widths snap up to the next one so the cache stays bounded
+try:
+    VARIANT_WIDTHS = sorted(int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "160,480,1024").split(","))
+    VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", 80))
+except ValueError:
+    raise RuntimeError("IMAGE_VARIANT_WIDTHS must be a comma separated list of integers and IMAGE_VARIANT_QUALITY an integer")
+
+# Render every width right after an upload instead of on first request
+EAGER_IMAGE_VARIANTS = os.environ.get("EAGER_IMAGE_VARIANTS", "false").lower() in ("1", "true", "yes")
+
+VARIANT_DIR = os.path.join(UPLOAD_DIR, ".variants")
+VARIANT_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+
+def snap_width(width: int) -> int:
+    for allowed in VARIANT_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return VARIANT_WIDTHS[-1]
+
+
+def variant_path(folder: str, filename: str, width: int, fmt: str) -> str:
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(VARIANT_DIR, folder, f"{stem}.w{width}.{fmt}")
+
+
+def ensure_variant(source_path: str, folder: str, filename: str, width: int, fmt: str = "webp") -> str:
+    """
+    Return the path of the `width`-wide variant of `source_path`, rendering it
+    if it is missing or older than the source (i.e. the source was replaced).
+    Blocking: call through run_in_threadpool.
+    """
+    target = variant_path(folder, filename, width, fmt)
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(source_path):
+            return target
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    pil_format, _ = VARIANT_FORMATS[fmt]
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    with Image.open(source_path) as image:
+        # Camera JPEGs carry orientation in EXIF; bake it in before resizing
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(tmp_path, pil_format, quality=VARIANT_QUALITY, optimize=True)
+    os.replace(tmp_path, target)
+    return target
+
+
+def generate_all_variants(source_path: str, folder: str, filename: str) -> None:
+    for width in VARIANT_WIDTHS:
+        for fmt in VARIANT_FORMATS:
+            try:
+                ensure_variant(source_path, folder, filename, width, fmt)
+            except Exception as e:
+                print(f"Image variant error ({folder}/{filename} w{width} {fmt}): {e}")
+
+
+def remove_variants(folder: str, filename: str) -> None:
+    """Drop every cached variant of a source file."""
+    for width in VARIANT_WIDTHS:
+        for fmt in VARIANT_FORMATS:
+            path = variant_path(folder, filename, width, fmt)
+            if os.path.exists(path):
+                os.remove(path)
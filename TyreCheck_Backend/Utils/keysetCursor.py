@@ -0,0 +1,34 @@
+'''
+Opaque keyset pagination cursors for the claim list
+
+A cursor is the (first Request_Date, Claim_Warranty_Id) of the last claim on
+a page, as URL-safe base64 JSON without padding. The date is null for claims
+that have no Request_Date at all.
+'''
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created: Optional[datetime], claim_id: str) -> str:
+    """Opaque keyset cursor over (first Request_Date, Claim_Warranty_Id); the date may be null."""
+    raw = json.dumps([str(created) if created is not None else None, claim_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(first Request_Date as stored in the cursor or None, Claim_Warranty_Id); 400 for anything else."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, claim_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(claim_id, str) or not (created is None or isinstance(created, str)):
+            raise ValueError("cursor fields have the wrong type")
+        if created is not None:
+            datetime.fromisoformat(created)
+        return created, claim_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
@@ -0,0 +1,231 @@
+'''
+Persistent SQLite index of the images in UPLOAD_DIR
+
+Keeps one row per image (folder, name, type, size, sha256, mtime, dimensions)
+so "what images does this claim have" is an indexed lookup instead of a
+directory walk. /upload-image writes through on every save; reconcile()
+catches anything written behind its back, rescanning only folders whose
+directory mtime moved since the last pass.
+
+Rebuild / catch up from the command line:
+    python -m Utils.manifestIndex            # incremental
+    python -m Utils.manifestIndex --full     # re-check every folder
+'''
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from PIL import Image
+
+from Utils.uploads import UPLOAD_DIR, ALLOWED_EXTENSIONS, file_sha256
+
+# Container-local on purpose: WAL mode needs shared memory, which is not reliable on the
+# bind-mounted / network UPLOAD_DIR. The index is rebuilt from the folders on demand
+# (imageManifest rescans any folder it has no record of), so losing it is harmless.
+MANIFEST_DB_PATH = os.environ.get("MANIFEST_DB_PATH", "/tmp/tyrecheck_manifest.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    folder      TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    image_type  TEXT NOT NULL,
+    position    TEXT,
+    size        INTEGER NOT NULL,
+    sha256      TEXT NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    width       INTEGER,
+    height      INTEGER,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS ix_images_type_folder ON images (image_type, folder);
+CREATE INDEX IF NOT EXISTS ix_images_sha256 ON images (sha256);
+CREATE TABLE IF NOT EXISTS folders (
+    folder        TEXT PRIMARY KEY,
+    dir_mtime_ns  INTEGER NOT NULL,
+    scanned_at    REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+
+
+def connection() -> sqlite3.Connection:
+    """One connection per thread; WAL lets readers run while an upload writes."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(MANIFEST_DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(MANIFEST_DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def classify_image(name: str) -> str:
+    """raw / defect / gauge / other, from the capture app's file naming."""
+    lowered = name.lower()
+    if lowered.startswith("raw_image"):
+        return "raw"
+    if lowered.startswith("guage") or lowered.startswith("gauge"):
+        return "gauge"
+    if lowered.startswith("defect"):
+        return "defect"
+    return "other"
+
+
+def image_position(name: str):
+    """'inside' / 'outside' for defect shots, None otherwise."""
+    match = re.search(r"defect-(inside|outside)", name.lower())
+    return match.group(1) if match else None
+
+
+def image_dimensions(path: str):
+    try:
+        # Only the header is parsed, pixels are not decoded
+        with Image.open(path) as image:
+            return image.size
+    except Exception as e:
+        print(f"Manifest image read error ({path}): {e}")
+        return None, None
+
+
+def upsert_image(folder: str, name: str, path: str, sha256: Optional[str] = None) -> dict:
+    """
+    Record (or refresh) one image. Pass `sha256` when the caller already hashed
+    the bytes, as the upload pipeline does, to avoid reading the file again.
+    """
+    stat_result = os.stat(path)
+    width, height = image_dimensions(path)
+    row = {
+        "folder": folder,
+        "name": name,
+        "image_type": classify_image(name),
+        "position": image_position(name),
+        "size": stat_result.st_size,
+        "sha256": sha256 or file_sha256(path),
+        "mtime_ns": stat_result.st_mtime_ns,
+        "width": width,
+        "height": height,
+    }
+    conn = connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO images (folder, name, image_type, position, size, sha256, mtime_ns, width, height) "
+            "VALUES (:folder, :name, :image_type, :position, :size, :sha256, :mtime_ns, :width, :height)",
+            row
+        )
+    return row
+
+
+def mark_folder_scanned(folder: str, dir_mtime_ns: int) -> None:
+    conn = connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO folders (folder, dir_mtime_ns, scanned_at) VALUES (?, ?, ?)",
+            (folder, dir_mtime_ns, time.time())
+        )
+
+
+def folder_scanned_mtime(folder: str) -> Optional[int]:
+    row = connection().execute("SELECT dir_mtime_ns FROM folders WHERE folder = ?", (folder,)).fetchone()
+    return row["dir_mtime_ns"] if row else None
+
+
+def images_for_folder(folder: str, image_type: Optional[str] = None) -> list:
+    sql = "SELECT * FROM images WHERE folder = ?"
+    params = [folder]
+    if image_type:
+        sql += " AND image_type = ?"
+        params.append(image_type)
+    return [dict(row) for row in connection().execute(sql + " ORDER BY name", params)]
+
+
+def images_by_type(image_type: str, limit: int = 1000) -> list:
+    return [dict(row) for row in connection().execute(
+        "SELECT * FROM images WHERE image_type = ? ORDER BY folder, name LIMIT ?", (image_type, limit)
+    )]
+
+
+def find_by_hash(sha256: str) -> list:
+    return [dict(row) for row in connection().execute("SELECT * FROM images WHERE sha256 = ?", (sha256,))]
+
+
+def reconcile_folder(folder: str, full: bool = False) -> dict:
+    """
+    Bring one folder's rows in line with the disk. Skipped when the directory
+    mtime matches the last scan (unless `full`); otherwise only files whose
+    size or mtime changed are re-hashed, and rows for deleted files are dropped.
+    """
+    directory = os.path.join(UPLOAD_DIR, folder)
+    try:
+        dir_mtime_ns = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        conn = connection()
+        with conn:
+            removed = conn.execute("DELETE FROM images WHERE folder = ?", (folder,)).rowcount
+            conn.execute("DELETE FROM folders WHERE folder = ?", (folder,))
+        return {"folder": folder, "updated": 0, "removed": removed, "skipped": False}
+
+    if not full and folder_scanned_mtime(folder) == dir_mtime_ns:
+        return {"folder": folder, "updated": 0, "removed": 0, "skipped": True}
+
+    known = {row["name"]: row for row in images_for_folder(folder)}
+    seen = set()
+    updated = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in ALLOWED_EXTENSIONS:
+                continue
+            seen.add(entry.name)
+            stat_result = entry.stat()
+            old = known.get(entry.name)
+            if old and old["size"] == stat_result.st_size and old["mtime_ns"] == stat_result.st_mtime_ns:
+                continue
+            upsert_image(folder, entry.name, entry.path)
+            updated += 1
+
+    stale = [name for name in known if name not in seen]
+    conn = connection()
+    with conn:
+        conn.executemany("DELETE FROM images WHERE folder = ? AND name = ?", [(folder, name) for name in stale])
+    mark_folder_scanned(folder, dir_mtime_ns)
+    return {"folder": folder, "updated": updated, "removed": len(stale), "skipped": False}
+
+
+def reconcile(full: bool = False) -> dict:
+    """Walk UPLOAD_DIR's claim folders (not the files) and reconcile the ones that changed."""
+    totals = {"folders": 0, "rescanned": 0, "updated": 0, "removed": 0}
+    on_disk = set()
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            on_disk.add(entry.name)
+            result = reconcile_folder(entry.name, full=full)
+            totals["folders"] += 1
+            totals["rescanned"] += 0 if result["skipped"] else 1
+            totals["updated"] += result["updated"]
+            totals["removed"] += result["removed"]
+
+    # Folders deleted from disk
+    indexed = {row["folder"] for row in connection().execute("SELECT folder FROM folders")}
+    for folder in indexed - on_disk:
+        totals["removed"] += reconcile_folder(folder)["removed"]
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile the shared_uploads manifest index")
+    parser.add_argument("--full", action="store_true", help="re-check every folder, not just changed ones")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    print({**reconcile(full=args.full), "seconds": round(time.perf_counter() - started, 2)})
@@ -0,0 +1,61 @@
+'''
+Bounded worker pool for bcrypt hashing and verification
+'''
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException, status
+
+try:
+    # bcrypt releases the GIL while hashing, so threads give real parallelism
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+    # Password jobs allowed in flight (running + queued) before new logins get a 503
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+except ValueError:
+    raise RuntimeError("PASSWORD_HASH_WORKERS and PASSWORD_HASH_MAX_PENDING must be integers")
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_pending = 0
+_rejected = 0
+_completed = 0
+
+
+async def run_password_task(func: Callable, *args):
+    """
+    Run a bcrypt call on the password pool without blocking the event loop.
+    Raises 503 (with Retry-After) when PASSWORD_HASH_MAX_PENDING jobs are already in flight.
+    """
+    global _pending, _rejected, _completed
+    with _lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            _rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={"message": "Login service is busy, please retry"},
+                headers={"Retry-After": "1"}
+            )
+        _pending += 1
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, func, *args)
+    finally:
+        with _lock:
+            _pending -= 1
+            _completed += 1
+
+
+def password_pool_stats() -> dict:
+    with _lock:
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "pending": _pending,
+            "completed": _completed,
+            "rejected": _rejected,
+        }
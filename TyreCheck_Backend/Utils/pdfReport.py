@@ -0,0 +1,116 @@
+'''
+Server-side claim report PDF rendering (runs inside the export worker pool)
+'''
+
+import os
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+
+from Utils.imageVariants import ensure_variant, snap_width
+
+# Images are scaled to this width so two fit side by side
+IMAGE_WIDTH = 8 * cm
+# Embedded from the resized variant cache, never the full-size camera JPEG
+IMAGE_VARIANT_WIDTH = snap_width(480)
+
+
+def _text(value, style):
+    """Paragraph of plain text; Paragraph parses markup, so DB values containing < or & are escaped."""
+    return Paragraph(escape("" if value is None else str(value)), style)
+
+
+def _claim_image(image_root: str, image: dict):
+    """Return a flowable for one tyre image of a claim, or None if it is not on disk."""
+    folder = image.get("folder_name")
+    image_name = image.get("Image_name")
+    if not folder or not image_name:
+        return None
+
+    filename = os.path.basename(image_name)
+    path = os.path.join(image_root, os.path.basename(folder), filename)
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        variant = ensure_variant(path, os.path.basename(folder), filename, IMAGE_VARIANT_WIDTH, "jpeg")
+        flowable = Image(variant)
+        ratio = IMAGE_WIDTH / float(flowable.imageWidth)
+        flowable.drawWidth = IMAGE_WIDTH
+        flowable.drawHeight = flowable.imageHeight * ratio
+        return flowable
+    except Exception as e:
+        print(f"PDF image error ({path}): {e}")
+        return None
+
+
+def _image_grid(image_root: str, images: List[dict], styles):
+    """Two images per row, each captioned with its ImageType; None when none are on disk."""
+    cells = []
+    for image in images:
+        flowable = _claim_image(image_root, image)
+        if flowable is not None:
+            cells.append([flowable, _text(image.get("ImageType"), styles["Normal"])])
+    if not cells:
+        return None
+    rows = [cells[i:i + 2] for i in range(0, len(cells), 2)]
+    if len(rows[-1]) == 1:
+        rows[-1].append("")
+    grid = Table(rows, colWidths=[8.5 * cm, 8.5 * cm])
+    grid.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
+    return grid
+
+
+def render_claim_report_pdf(rows: List[dict], columns: List[str], filters: dict, images: Dict[str, List[dict]],
+                            image_root: str, output_path: str) -> str:
+    """
+    Render rows from usp_getTyreReportFiltered (one per claim) into `output_path`,
+    one section per claim with its field table and the claim's tyre images.
+    `images` maps Claim_Warranty_Id to its tyre rows (folder_name, Image_name,
+    ImageType); files missing from `image_root` are left out.
+    Writes to a temp file and renames so readers never see a partial PDF.
+    """
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph("TyreCheck Claim Report", styles["Title"]),
+        _text(", ".join(f"{k}: {v}" for k, v in filters.items() if v) or "All claims", styles["Normal"]),
+        Paragraph(f"Rows: {len(rows)}", styles["Normal"]),
+        Spacer(1, 0.5 * cm),
+    ]
+
+    # Group rows by claim so each claim gets one section
+    claims = {}
+    for row in rows:
+        claims.setdefault(row.get("Claim_Warranty_Id") or "-", []).append(row)
+
+    for index, (claim_id, claim_rows) in enumerate(claims.items()):
+        if index:
+            story.append(PageBreak())
+        story.append(_text(f"Claim {claim_id}", styles["Heading2"]))
+
+        for row in claim_rows:
+            table = Table(
+                [[_text(col, styles["Normal"]), _text(row.get(col), styles["Normal"])] for col in columns],
+                colWidths=[5 * cm, 12 * cm]
+            )
+            table.setStyle(TableStyle([
+                ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+                ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]))
+            story.append(table)
+            story.append(Spacer(1, 0.4 * cm))
+
+        grid = _image_grid(image_root, images.get(claim_id, []), styles)
+        if grid is not None:
+            story.append(grid)
+
+    tmp_path = f"{output_path}.tmp"
+    SimpleDocTemplate(tmp_path, pagesize=A4, title="TyreCheck Claim Report").build(story)
+    os.replace(tmp_path, output_path)
+    return output_path
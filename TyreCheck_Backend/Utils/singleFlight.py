@@ -0,0 +1,115 @@
+'''
+Request coalescing for identical concurrent read queries
+
+At shift start many reviewers open the dashboard and summary with the same
+default filters. SingleFlight runs one DB execution per distinct key and
+hands its result to every request that arrived while it was in flight.
+An optional short-lived result cache (QUERY_RESULT_CACHE_SECONDS, off by
+default) keeps serving that result afterwards.
+
+Writes that change claim data call invalidate_claim_queries(): it drops cached
+results (including the dashboard's claim_total_cache) and moves to a new
+generation, so requests arriving after the write never join a flight that
+started before it.
+'''
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Hashable
+
+from Utils.cache import TTLCache
+
+
+try:
+    QUERY_RESULT_CACHE_SECONDS = int(os.environ.get("QUERY_RESULT_CACHE_SECONDS", 0))
+    QUERY_RESULT_CACHE_MAX_SIZE = int(os.environ.get("QUERY_RESULT_CACHE_MAX_SIZE", 256))
+except ValueError:
+    raise RuntimeError("QUERY_RESULT_CACHE_SECONDS and QUERY_RESULT_CACHE_MAX_SIZE must be integers")
+
+try:
+    CLAIM_TOTAL_CACHE_TTL_SECONDS = int(os.environ.get("CLAIM_TOTAL_CACHE_TTL_SECONDS", 30))
+except ValueError:
+    raise RuntimeError("CLAIM_TOTAL_CACHE_TTL_SECONDS must be an integer")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one task. Lives on the
+    event loop of one worker, so it needs no locking.
+    `factory` must not depend on the calling request's session: it runs as its
+    own task and can outlive the request that started it.
+    """
+
+    def __init__(self, name: str, result_ttl: int = 0, maxsize: int = 256):
+        self.name = name
+        self.generation = 0
+        self._inflight = {}
+        self.results = TTLCache(maxsize=maxsize, ttl=result_ttl) if result_ttl > 0 else None
+        self.executions = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if self.results is not None:
+            cached = self.results.get(key)
+            if cached is not None:
+                return cached
+
+        flight_key = (self.generation, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._finished(flight_key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        # One caller disconnecting must not cancel the query for the others
+        return await asyncio.shield(task)
+
+    def _finished(self, flight_key, task: asyncio.Task) -> None:
+        self._inflight.pop(flight_key, None)
+        generation, key = flight_key
+        if task.cancelled() or task.exception() is not None:
+            return
+        # A result computed before an invalidation is not cached
+        if self.results is not None and generation == self.generation:
+            self.results.set(key, task.result())
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        if self.results is not None:
+            self.results.clear()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "generation": self.generation,
+            "result_cache": self.results.stats() if self.results is not None else None,
+        }
+
+
+# /auth/claim/details pages
+claim_list_flight = SingleFlight("claim_list", QUERY_RESULT_CACHE_SECONDS, QUERY_RESULT_CACHE_MAX_SIZE)
+# /auth/summary/summary_report
+summary_flight = SingleFlight("summary_report", QUERY_RESULT_CACHE_SECONDS, QUERY_RESULT_CACHE_MAX_SIZE)
+
+# Filter-keyed COUNT(DISTINCT Claim_Warranty_Id) results for the dashboard, so
+# page flips do not re-count the table. Kept here so writes can clear it.
+claim_total_cache = TTLCache(maxsize=512, ttl=CLAIM_TOTAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_claim_queries() -> None:
+    """Call after anything that changes TBL_Tyre_Details (result updates, new uploads)."""
+    claim_list_flight.invalidate()
+    summary_flight.invalidate()
+    claim_total_cache.clear()
+
+
+def single_flight_stats() -> dict:
+    return {flight.name: flight.stats() for flight in (claim_list_flight, summary_flight)}
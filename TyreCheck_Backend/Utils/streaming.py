@@ -0,0 +1,42 @@
+'''
+Streaming helpers for large query results
+'''
+
+import csv
+import io
+import json
+
+from Database.engine import AsyncSessionLocal
+
+# Rows pulled from the server-side cursor per chunk of streamed output
+STREAM_CHUNK_ROWS = 500
+
+
+async def stream_query_rows(sql, params: dict, export_format: str = "ndjson"):
+    """
+    Async generator that runs `sql` on a server-side cursor and yields NDJSON
+    or CSV text chunk by chunk, so memory stays flat regardless of row count.
+    Opens its own session: the request-scoped one is closed before a
+    StreamingResponse body is sent.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(sql.execution_options(stream_results=True), params)
+        columns = list(result.keys())
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+            async for partition in result.partitions(STREAM_CHUNK_ROWS):
+                buffer.seek(0)
+                buffer.truncate(0)
+                writer.writerows(partition)
+                yield buffer.getvalue()
+        else:
+            async for partition in result.partitions(STREAM_CHUNK_ROWS):
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n"
+                    for row in partition
+                )
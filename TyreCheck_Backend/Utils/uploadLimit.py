@@ -0,0 +1,75 @@
+'''
+Request body size limits for the multipart upload routes
+
+Starlette parses (and spools to disk) the whole multipart body before the
+route runs, so a size check inside the route only fires after an oversized
+upload has been fully received. This middleware rejects by Content-Length
+before reading anything, and counts the bytes of chunked bodies as they
+arrive, answering 413 as soon as the limit is passed.
+'''
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """Pure ASGI middleware; `limits` maps a request path to its maximum body size in bytes."""
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        too_large = False
+        replied = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    too_large = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal replied
+            if too_large:
+                # FastAPI turns the parse failure into its own 400; answer 413 instead
+                if not replied and message["type"] == "http.response.start":
+                    replied = True
+                    await self._reject(scope, receive, send, limit)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if too_large and not replied:
+            await self._reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def _reject(scope, receive, send, limit: int):
+        response = JSONResponse(
+            {"detail": {"message": f"Request body exceeds {limit} bytes"}},
+            status_code=413,
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,76 @@
+'''
+Shared upload storage paths and validation helpers
+'''
+
+import hashlib
+import os
+import re
+
+from fastapi import HTTPException, status
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/shared_uploads")  # shared volume
+
+try:
+    MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+    UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 256 * 1024))
+    # Whole request body for the multi-file and archive routes
+    MAX_BATCH_UPLOAD_BYTES = int(os.environ.get("MAX_BATCH_UPLOAD_BYTES", 1024 * 1024 * 1024))
+except ValueError:
+    raise RuntimeError("MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES and MAX_BATCH_UPLOAD_BYTES must be integers")
+
+# Multipart boundaries, part headers and the form fields around a single file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Request path -> largest body accepted (Utils/uploadLimit.py)
+UPLOAD_BODY_LIMITS = {
+    "/upload-image": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/upload-images": MAX_BATCH_UPLOAD_BYTES,
+    "/upload-archive": MAX_BATCH_UPLOAD_BYTES,
+}
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Claim folders look like BLR3_25_048536; file names like defect-inside_<uuid>.jpg
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,199}$")
+
+
+def safe_name(value: str, what: str) -> str:
+    """Reject anything that could escape UPLOAD_DIR (separators, '..', hidden files)."""
+    value = (value or "").strip()
+    if not _SAFE_NAME.match(value) or ".." in value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": f"Invalid {what}: {value!r}"}
+        )
+    return value
+
+
+def folder_path(folder_name: str) -> str:
+    return os.path.join(UPLOAD_DIR, safe_name(folder_name, "FolderName"))
+
+
+def detect_image_type(head: bytes):
+    """Sniff the image format from its first bytes. Returns 'jpeg'/'png'/'webp' or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def check_extension(filename: str) -> None:
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail={"message": f"Unsupported file type: {filename}"}
+        )
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,287 @@
+'''
+End-to-end load benchmark for the TyreCheck API
+
+Simulated reviewers hit the API concurrently with a weighted mix of the
+dashboard list, summary report, claim view, dealer list and image upload.
+Results (throughput, error counts, latency percentiles) are reported per
+endpoint as JSON, tagged with the current git commit so runs can be compared
+between commits (--compare).
+
+Seed the database and upload tree first with benchmarks/synthetic.py; claim
+IDs are addressed by its CLM000000001.. numbering, so pass the same --claims.
+Requires httpx (pip install httpx).
+
+Usage:
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8086 \
+        --username bench --password bench --users 50 --duration 60 \
+        --mix details=40,summary=10,view=30,dealers=15,upload=5 --output run.json
+    python benchmarks/load_test.py ... --compare baseline.json --threshold 10
+    python benchmarks/load_test.py --in-process ...   # drive main.app via ASGI, no server
+'''
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import claim_id_for, dealer_codes, image_templates  # noqa: E402
+
+
+DEFAULT_MIX = "details=40,summary=10,view=30,dealers=15,upload=5"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_mix(raw: str) -> dict:
+    mix = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (known: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def date_range(rng: random.Random, days: int):
+    """A random whole-month-ish window inside the seeded range, or no dates at all (the dashboard default)."""
+    if rng.random() < 0.5:
+        return None, None
+    end = date.today() - timedelta(days=rng.randrange(days))
+    return (end - timedelta(days=30)).isoformat(), end.isoformat()
+
+
+##################### Scenarios ######################
+# Each returns (method, path, kwargs for httpx.request)
+
+def details(rng, ctx):
+    from_date, to_date = date_range(rng, ctx["days"])
+    return "POST", "/auth/claim/details", {
+        "params": {"per_page": 10},
+        "json": {
+            "DealerId": rng.choice(ctx["dealers"]) if rng.random() < 0.3 else None,
+            "Servicetype": None,
+            "FromDate": from_date,
+            "ToDate": to_date,
+            # Reviewers mostly stay on the first pages
+            "page": min(1 + int(rng.expovariate(0.7)), 50),
+        },
+    }
+
+
+def summary(rng, ctx):
+    from_date, to_date = date_range(rng, ctx["days"])
+    return "POST", "/auth/summary/summary_report", {
+        "json": {
+            "dealer_code": rng.choice(ctx["dealers"]) if rng.random() < 0.3 else None,
+            "from_date": from_date,
+            "to_date": to_date,
+        },
+    }
+
+
+def view(rng, ctx):
+    claim_id = claim_id_for(rng.randint(1, ctx["claims"]))
+    return "GET", f"/auth/viewClaim/Claim_ID={claim_id}", {}
+
+
+def dealers(rng, ctx):
+    return "GET", "/auth/dealers", {}
+
+
+def upload(rng, ctx):
+    prefix, body = rng.choice(ctx["images"])
+    name = f"{prefix}_{rng.getrandbits(48):012x}.jpg"
+    return "POST", "/upload-image", {
+        "files": {"file": (name, io.BytesIO(body), "image/jpeg")},
+        "data": {"FolderName": f"BENCH_{rng.randint(1, 200):05d}"},
+    }
+
+
+SCENARIOS = {
+    "details": details,
+    "summary": summary,
+    "view": view,
+    "dealers": dealers,
+    "upload": upload,
+}
+
+
+##################### Runner ######################
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/auth/user/user_login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def virtual_user(client, mix, ctx, deadline, rng, samples):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights=weights)[0]
+        method, path, kwargs = SCENARIOS[name](rng, ctx)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            await response.aread()
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        samples[name].append((time.perf_counter() - started, status))
+
+
+def summarise(samples: list, wall: float) -> dict:
+    latencies = [elapsed for elapsed, _ in samples]
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "status": dict(statuses),
+        "rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    ctx = {
+        "claims": args.claims,
+        "days": args.days,
+        "dealers": dealer_codes(args.dealers),
+        "images": list(image_templates((640, 480)).items()),
+    }
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    if args.in_process:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+
+    async with client:
+        token = args.token or await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        if args.warmup:
+            warmup = {name: [] for name in mix}
+            await asyncio.gather(*(
+                virtual_user(client, mix, ctx, time.perf_counter() + args.warmup, random.Random(1000 + n), warmup)
+                for n in range(args.users)
+            ))
+
+        samples = {name: [] for name in mix}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, mix, ctx, deadline, random.Random(args.seed + n), samples)
+            for n in range(args.users)
+        ))
+        wall = time.perf_counter() - started
+
+    everything = [sample for endpoint in samples.values() for sample in endpoint]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+            "target": "in-process" if args.in_process else args.base_url,
+            "users": args.users,
+            "duration_seconds": args.duration,
+            "mix": mix,
+            "wall_seconds": round(wall, 2),
+        },
+        "total": summarise(everything, wall),
+        "endpoints": {name: summarise(endpoint_samples, wall) for name, endpoint_samples in samples.items()},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Endpoints whose p95 grew or throughput fell by more than `threshold` percent."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before["requests"]:
+            continue
+        p95_change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        rps_change = (current["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0.0
+        current["vs_baseline"] = {
+            "baseline_commit": baseline.get("meta", {}).get("commit"),
+            "p95_change_pct": round(p95_change, 1),
+            "rps_change_pct": round(rps_change, 1),
+        }
+        if p95_change > threshold or rps_change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.environ.get("BENCH_BASE_URL", "http://127.0.0.1:8086"))
+    parser.add_argument("--in-process", action="store_true", help="drive main.app through ASGI instead of HTTP")
+    parser.add_argument("--username", default=os.environ.get("BENCH_USERNAME", "bench"))
+    parser.add_argument("--password", default=os.environ.get("BENCH_PASSWORD", "bench"))
+    parser.add_argument("--token", help="use this bearer token instead of logging in")
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated reviewers")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of unmeasured load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight,... from: " + ", ".join(SCENARIOS))
+    parser.add_argument("--claims", type=int, default=20000, help="claims seeded by synthetic.py")
+    parser.add_argument("--dealers", type=int, default=150, help="dealers seeded by synthetic.py")
+    parser.add_argument("--days", type=int, default=365, help="date span seeded by synthetic.py")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report from an earlier run")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold in percent for --compare")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(report, json.load(handle), args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
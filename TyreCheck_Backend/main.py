@@ -1,18 +1,25 @@
-from fastapi import FastAPI, status, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, status, HTTPException, Depends, UploadFile, File, Form, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from fastapi.params import Depends
-from pathlib import Path
-from fastapi.staticfiles import StaticFiles
 #Routing
 from Routes.userRoutes import public_user_router
 from Routes.dashboardRoute import protected_dashboard_router
 from Routes.viewClaimRoutes import protected_claimView_route
 from Routes.summaryRoute import protected_summary_route
 from Routes.dealersRoute import protected_dealer_route
+from Routes.metricsRoute import protected_metrics_route
+from Routes.uploadRoutes import upload_router
+from Routes.imageRoutes import image_router, protected_image_index_route
+from Controllers.rollupController import rollup_refresh_loop, ROLLUP_REFRESH_SECONDS
+from Controllers.uploadController import save_image_stream, iter_upload_file
+from Utils.uploads import UPLOAD_DIR, UPLOAD_BODY_LIMITS
+from Utils.uploadLimit import UploadSizeLimitMiddleware
+from Utils.compression import CompressionMiddleware
+from Database.queryMetrics import RequestTiming, current_request, route_metrics, route_template
 #Access Route
-import shutil, os
+import os, asyncio, time
 
 app = FastAPI(debug=True)
 app.add_middleware(
@@ -21,17 +28,52 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paging/export headers read by the UI and scripts
+    expose_headers=["X-Page", "X-Limit", "X-Has-More", "X-Export-After", "X-Export-Watermark", "Server-Timing"],
 )
-shared_folder_path = Path(__file__).parent.parent / "shared_uploads"
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware, limits=UPLOAD_BODY_LIMITS)
+
+
+@app.middleware("http")
+async def sql_timing(request: Request, call_next):
+    """
+    Attributes every SQL statement run while handling the request to its route
+    and records total vs DB time (see Database/queryMetrics.py).
+    Streamed bodies keep running after this returns, so their DB time is only
+    partly counted.
+    """
+    timing = RequestTiming(route_template(request))
+    token = current_request.set(timing)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_request.reset(token)
+    total_ms = (time.perf_counter() - started) * 1000
+    route_metrics.record_request(timing, total_ms)
+
+    server_timing = f"db;dur={timing.db_ms:.2f}, app;dur={total_ms - timing.db_ms:.2f}"
+    existing = response.headers.get("Server-Timing")
+    response.headers["Server-Timing"] = f"{existing}, {server_timing}" if existing else server_timing
+    return response
 
-# Mount images folder
-app.mount("/protected_claim/images", StaticFiles(directory=shared_folder_path), name="images")
 
 app.include_router(public_user_router, prefix="/auth")
 app.include_router(protected_dashboard_router, prefix="/auth")
 app.include_router(protected_claimView_route, prefix="/auth")
 app.include_router(protected_summary_route, prefix="/auth")
 app.include_router(protected_dealer_route, prefix="/auth")
+app.include_router(protected_metrics_route, prefix="/auth")
+app.include_router(upload_router)
+app.include_router(image_router)
+app.include_router(protected_image_index_route, prefix="/auth")
+
+@app.on_event("startup")
+async def start_rollup_refresher():
+    if ROLLUP_REFRESH_SECONDS > 0:
+        app.state.rollup_task = asyncio.create_task(rollup_refresh_loop())
+
 
 @app.get('/')
 async def root():
@@ -40,35 +82,23 @@ async def root():
         "Message": "TyreCheck_Claim_API"
     }
     
-UPLOAD_DIR = "/shared_uploads"  # shared volume
-
 # Ensure folder exists inside container
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @app.post("/upload-image")
 async def upload_image(file: UploadFile = File(...),FolderName: str = Form()):
+    """
+    Streams the image to disk in chunks (size/type checked on the way; bodies
+    over the limit are refused before parsing by UploadSizeLimitMiddleware),
+    renames it into place atomically and returns its SHA-256.
+    Re-uploading identical bytes is a no-op ("unchanged": true).
+    """
     try:
-        # Create folder inside UPLOAD_DIR
-        target_folder = os.path.join(UPLOAD_DIR, FolderName)
-        os.makedirs(target_folder, exist_ok=True)
-
-        # Keep original filename
-        original_filename = file.filename
-
-        # Full path
-        file_path = os.path.join(target_folder, original_filename)
-
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        return {
-            "status": "success",
-            "filename": original_filename,
-            "folder": FolderName,
-            "path": f"/uploads/{FolderName}/{original_filename}"
-        }
+        saved = await save_image_stream(FolderName, file.filename, iter_upload_file(file))
+        return {"status": "success", **saved}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
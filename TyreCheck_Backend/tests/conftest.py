@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# Keep uploads, the manifest index and export artifacts off the real volumes
+_SCRATCH = tempfile.mkdtemp(prefix="tyrecheck_tests_")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_SCRATCH, "uploads"))
+os.environ.setdefault("MANIFEST_DB_PATH", os.path.join(_SCRATCH, "manifest.sqlite3"))
+os.environ.setdefault("EXPORT_DIR", os.path.join(_SCRATCH, "exports"))
@@ -0,0 +1,59 @@
+'''
+Accept-Encoding negotiation and ETags on encoded responses (Utils/compression.py)
+'''
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from Utils import compression
+from Utils.compression import CompressionMiddleware, choose_encoding
+from Utils.fileServing import etag_matches
+
+
+BODY = b'{"rows": [' + b'"x",' * 2000 + b'"x"]}'
+ETAG = '"abc123"'
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0.0", None),
+    ("gzip; q=0.000", None),
+    ("gzip;q=0.5", "gzip"),
+    ("gzip;q=bogus", None),
+    ("identity", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("", None),
+])
+def test_choose_encoding_gzip(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_refused_br_falls_back_to_gzip():
+    assert choose_encoding("br;q=0.000, gzip") == "gzip"
+
+
+def _client():
+    async def payload(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": ETAG})
+
+    app = Starlette(routes=[Route("/payload", payload)])
+    return TestClient(CompressionMiddleware(app))
+
+
+def test_encoded_response_gets_weak_etag():
+    response = _client().get("/payload", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == "W/" + ETAG
+    assert etag_matches(response.headers["etag"], ETAG)
+
+
+def test_identity_response_keeps_strong_etag():
+    response = _client().get("/payload", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
@@ -0,0 +1,151 @@
+'''
+Core query layer (Controllers/coreQueries.py) on a synthetic SQLite database
+
+Needs no stored procedures and no MySQL: benchmarks/synthetic.py supplies
+volume, and a few hand-written claims supply values to assert against.
+Run from TyreCheck_Backend with `python -m pytest -q tests`.
+'''
+
+from datetime import datetime
+
+import pytest
+from synthetic import seed  # sets placeholder DB_* env before the app modules load
+
+from sqlalchemy import create_engine, insert, select
+
+from Controllers import coreQueries
+from Database.models import ClaimWarranty, DealerMaster
+
+
+DEALER = "DLRTEST1"
+
+
+def tyre_row(claim_id, image_type, when, **values):
+    return {
+        "Claim_Warranty_Id": claim_id,
+        "ImageType": image_type,
+        "Dealer_Code": DEALER,
+        "Service_type": "claim",
+        "Request_Date": when,
+        **values,
+    }
+
+
+KNOWN_ROWS = [
+    # One full claim: 10:00:00 -> 10:07:15, scores 80/70/90 (the gauge row has none)
+    tyre_row("KNOWN000001", "Outside", datetime(2020, 3, 10, 10, 0, 0), Result_percentage=80, ai_result="Cut (80%)",
+             folder_name="KNOWN000001", Image_name="defect-outside_1.jpg"),
+    tyre_row("KNOWN000001", "Inside", datetime(2020, 3, 10, 10, 2, 30), Result_percentage=70, ai_result="Bulge (70%)",
+             folder_name="KNOWN000001", Image_name="defect-inside_1.jpg"),
+    tyre_row("KNOWN000001", "Gauge", datetime(2020, 3, 10, 10, 5, 45), Gauge_reading="7.5"),
+    tyre_row("KNOWN000001", "Final", datetime(2020, 3, 10, 10, 7, 15), Result_percentage=90, Final_Defect="Cut",
+             Exception_Occurred="Model timeout"),
+    # Either side of a day boundary
+    tyre_row("KNOWN000002", "Outside", datetime(2020, 3, 11, 23, 59, 59), Result_percentage=55),
+    tyre_row("KNOWN000003", "Outside", datetime(2020, 3, 12, 0, 0, 0), Result_percentage=65),
+    # Target of the update test
+    tyre_row("KNOWN000004", "Outside", datetime(2020, 3, 13, 9, 0, 0), Result_percentage=40,
+             Remark="original remark", CorrectedValue="Bulge"),
+]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('core') / 'core.db'}")
+    seed(engine, claims=300, dealers=12, days=90)
+    with engine.begin() as connection:
+        connection.execute(insert(DealerMaster.__table__), [{"Dealer_code": DEALER, "Dealer_name": "Test Tyres"}])
+        # executemany wants the same keys in every row
+        columns = {key for row in KNOWN_ROWS for key in row}
+        connection.execute(insert(ClaimWarranty.__table__), [{key: row.get(key) for key in columns} for row in KNOWN_ROWS])
+    yield engine
+    engine.dispose()
+
+
+def fetch(engine, statement):
+    with engine.connect() as connection:
+        return connection.execute(statement).mappings().all()
+
+
+def test_shape_claim_page_formats_like_the_procedure(engine):
+    rows = fetch(engine, coreQueries.claim_page_query(1, 10, dealer=DEALER, from_date="2020-03-10", to_date="2020-03-10"))
+
+    assert coreQueries.shape_claim_page(rows) == [{
+        "Claim_Warranty_Id": "KNOWN000001",
+        "Dealer_name": "Test Tyres",
+        "Service_type": "claim",
+        "CreatedDate": "10/03/2020 10:00",
+        "TotalAVG": "80.00",
+        "InspectionTime": "7 minutes 15 seconds",
+        "View": "KNOWN000001",
+    }]
+
+
+def test_claim_filters_cover_whole_days(engine):
+    def claims(**filters):
+        return [row["Claim_Warranty_Id"] for row in fetch(engine, coreQueries.claim_page_query(1, 10, dealer=DEALER, **filters))]
+
+    # to_date includes 23:59:59 of that day and nothing of the next
+    assert claims(from_date="2020-03-11", to_date="2020-03-11") == ["KNOWN000002"]
+    # from_date starts at 00:00:00
+    assert claims(from_date="2020-03-12", to_date="2020-03-12") == ["KNOWN000003"]
+    assert claims(from_date="2020-03-10", to_date="2020-03-12") == ["KNOWN000003", "KNOWN000002", "KNOWN000001"]
+
+    with engine.connect() as connection:
+        count = connection.execute(coreQueries.claim_count_query(dealer=DEALER, to_date="2020-03-11")).scalar()
+    assert count == 2
+
+
+def test_claim_report_pivots_image_rows_into_columns(engine):
+    [row] = fetch(engine, coreQueries.claim_report_query(claim_id="KNOWN000001"))
+
+    assert row["Dealer_name"] == "Test Tyres"
+    assert row["Dealer_Code"] == DEALER
+    assert row["OutsideDamageOutput"] == "Cut (80%)"
+    assert row["InsideDamageOutput"] == "Bulge (70%)"
+    assert row["FinalDamageOutput"] == "Cut"
+    assert row["TreadDepthGaugeOutput"] == "7.5"
+    assert row["ClaimDate"] == datetime(2020, 3, 10, 10, 0, 0)
+    assert row["FinalException_Occurred"] == "Model timeout"
+    assert row["OutsideException_Occurred"] is None
+
+
+def test_claim_images_lists_each_claims_image_rows(engine):
+    rows = fetch(engine, coreQueries.claim_images_query(["KNOWN000001", "KNOWN000002"]))
+
+    assert [(row["Claim_Warranty_Id"], row["ImageType"], row["Image_name"]) for row in rows] == [
+        ("KNOWN000001", "Outside", "defect-outside_1.jpg"),
+        ("KNOWN000001", "Inside", "defect-inside_1.jpg"),
+    ]
+
+
+def test_claim_pages_are_disjoint_and_newest_first(engine):
+    first = fetch(engine, coreQueries.claim_page_query(1, 10))
+    second = fetch(engine, coreQueries.claim_page_query(2, 10))
+
+    assert len(first) == len(second) == 10
+    assert not {row["Claim_Warranty_Id"] for row in first} & {row["Claim_Warranty_Id"] for row in second}
+    dates = [row["first_request"] for row in first + second]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_claim_summary_offset_is_applied_in_sql(engine):
+    everything = fetch(engine, coreQueries.claim_summary_query(service_type="claim", top_list=40))
+    page = fetch(engine, coreQueries.claim_summary_query(service_type="claim", top_list=10, offset=20))
+
+    assert [dict(row) for row in page] == [dict(row) for row in everything[20:30]]
+
+
+def test_update_tyre_query_keeps_omitted_fields(engine):
+    table = ClaimWarranty.__table__
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        target = connection.execute(select(table.c.ID).where(table.c.Claim_Warranty_Id == "KNOWN000004")).scalar()
+        changed = connection.execute(coreQueries.update_tyre_query("KNOWN000004", target, remark="rechecked"))
+        row = connection.execute(
+            select(table.c.Remark, table.c.CorrectedValue, table.c.Result_percentage).where(table.c.ID == target)
+        ).one()
+        transaction.rollback()
+
+    assert changed.rowcount == 1
+    assert tuple(row) == ("rechecked", "Bulge", 40)
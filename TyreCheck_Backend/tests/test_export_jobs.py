@@ -0,0 +1,69 @@
+'''
+File-backed export job state (Controllers/exportController.py), shared by every worker through EXPORT_DIR
+'''
+
+import os
+import time
+
+import pytest
+from synthetic import seed  # sets placeholder DB_* env before the app modules load
+
+from Controllers import exportController as exports
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    for name, sub in (("EXPORT_DIR", ""), ("JOBS_DIR", "jobs"), ("INFLIGHT_DIR", "inflight"), ("LATEST_DIR", "latest")):
+        path = tmp_path / sub
+        path.mkdir(exist_ok=True)
+        monkeypatch.setattr(exports, name, str(path))
+    return tmp_path
+
+
+def test_job_is_readable_from_disk():
+    job = exports._new_job({"claim_id": None}, "f" * 64, "pending")
+
+    assert exports.get_export_job(job["job_id"]) == job
+
+
+@pytest.mark.parametrize("job_id", ["../../etc/passwd", "", "A" * 32, "0" * 31])
+def test_malformed_job_ids_are_not_found(job_id):
+    with pytest.raises(exports.HTTPException) as error:
+        exports.get_export_job(job_id)
+    assert error.value.status_code == 404
+
+
+def test_identical_render_is_shared_until_it_finishes():
+    first = exports._new_job({}, "a" * 64, "pending")
+    assert exports._claim_inflight("a" * 64, first["job_id"]) is None
+
+    second = exports._new_job({}, "a" * 64, "pending")
+    assert exports._claim_inflight("a" * 64, second["job_id"])["job_id"] == first["job_id"]
+
+    first["status"] = "done"
+    exports.save_job(first)
+    assert exports._claim_inflight("a" * 64, second["job_id"]) is None
+
+
+def test_newer_artifact_replaces_the_superseded_one(export_dir):
+    for fingerprint in ("old", "new"):
+        open(exports.artifact_path(fingerprint), "wb").close()
+        exports._replace_latest({"claim_id": "C1"}, fingerprint)
+
+    assert not os.path.exists(exports.artifact_path("old"))
+    assert os.path.exists(exports.artifact_path("new"))
+
+
+def test_cleanup_removes_only_expired_files():
+    stale = exports._new_job({}, "b" * 64, "done")
+    fresh = exports._new_job({}, "c" * 64, "done")
+    for fingerprint in ("b" * 64, "c" * 64):
+        open(exports.artifact_path(fingerprint), "wb").close()
+    old = time.time() - 2 * exports.EXPORT_JOB_TTL_SECONDS
+    for path in (exports._job_path(stale["job_id"]), exports.artifact_path("b" * 64)):
+        os.utime(path, (old, old))
+
+    assert exports.cleanup_exports() == 2
+    assert exports.load_job(stale["job_id"]) is None
+    assert exports.load_job(fresh["job_id"]) is not None
+    assert os.path.exists(exports.artifact_path("c" * 64))
@@ -0,0 +1,113 @@
+'''
+Conditional and range requests for claim images (Utils/fileServing.py)
+'''
+
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from Utils.fileServing import _UNSATISFIABLE, _parse_range, etag_matches, file_etag, serve_file
+
+
+ETAG = '"1a-64-abc"'
+
+
+@pytest.mark.parametrize("header, expected", [
+    (ETAG, True),
+    ("W/" + ETAG, True),
+    (f'"other", {ETAG}', True),
+    (f'"other",W/{ETAG}', True),
+    ("*", True),
+    (" * ", True),
+    ('"other"', False),
+    ('"1a-64-ab"', False),
+    ("1a-64-abc", False),
+    ("", False),
+])
+def test_etag_matches_uses_weak_comparison(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    ("bytes=0-99", 1000, (0, 99)),
+    ("bytes=100-", 1000, (100, 999)),
+    ("bytes=990-2000", 1000, (990, 999)),
+    (" bytes=5-5 ", 1000, (5, 5)),
+    # suffix ranges: the last N bytes
+    ("bytes=-100", 1000, (900, 999)),
+    ("bytes=-5000", 1000, (0, 999)),
+    ("bytes=-0", 1000, _UNSATISFIABLE),
+    # outside the file
+    ("bytes=1000-", 1000, _UNSATISFIABLE),
+    ("bytes=1000-1001", 1000, _UNSATISFIABLE),
+    ("bytes=0-0", 0, _UNSATISFIABLE),
+    # not answered by serve_file itself
+    ("bytes=0-1,5-6", 1000, None),
+    ("bytes=-", 1000, None),
+    ("bytes=9-3", 1000, None),
+    ("items=0-9", 1000, None),
+    ("bytes=a-b", 1000, None),
+])
+def test_parse_range(header, size, expected):
+    assert _parse_range(header, size) == expected
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "defect-outside_1.jpg"
+    path.write_bytes(bytes(range(256)) * 4)
+
+    async def image(request):
+        return serve_file(request, str(path), media_type="image/jpeg")
+
+    client = TestClient(Starlette(routes=[Route("/image", image)]))
+    client.etag = file_etag(os.stat(path))
+    return client
+
+
+def test_range_is_served_as_206(client):
+    response = client.get("/image", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert response.content == bytes(range(10, 20))
+
+
+def test_unsatisfiable_range_is_416(client):
+    response = client.get("/image", headers={"Range": "bytes=5000-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_multi_range_is_not_refused(client):
+    # FileResponse sends the whole file, or multipart/byteranges on Starlette versions that support it
+    response = client.get("/image", headers={"Range": "bytes=0-1,5-6"})
+
+    assert response.status_code in (200, 206)
+    if response.status_code == 206:
+        assert response.headers["content-type"].startswith("multipart/byteranges")
+
+
+@pytest.mark.parametrize("if_range, status", [
+    (None, 206),
+    ("current", 206),
+    ("weak", 200),
+    ('"stale"', 200),
+])
+def test_if_range_needs_a_strong_match(client, if_range, status):
+    headers = {"Range": "bytes=0-9"}
+    if if_range:
+        headers["If-Range"] = {"current": client.etag, "weak": "W/" + client.etag}.get(if_range, if_range)
+
+    assert client.get("/image", headers=headers).status_code == status
+
+
+def test_if_none_match_is_304_even_with_a_range(client):
+    response = client.get("/image", headers={"If-None-Match": "W/" + client.etag, "Range": "bytes=0-9"})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == client.etag
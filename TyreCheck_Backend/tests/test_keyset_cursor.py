@@ -0,0 +1,51 @@
+'''
+Keyset pagination cursors for /auth/claim/details (Utils/keysetCursor.py)
+'''
+
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from fastapi import HTTPException
+
+from Utils.keysetCursor import decode_cursor, encode_cursor
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("created, claim_id, expected_created", [
+    (datetime(2020, 3, 10, 10, 0, 0), "KNOWN000001", "2020-03-10 10:00:00"),
+    (datetime(2020, 3, 10, 10, 0, 0, 123456), "KNOWN000001", "2020-03-10 10:00:00.123456"),
+    # SQLite hands dates back as strings
+    ("2020-03-10 10:00:00", "KNOWN000001", "2020-03-10 10:00:00"),
+    # Claims without any Request_Date sort last and still get a cursor
+    (None, "KNOWN000002", None),
+    (datetime(2020, 3, 10), "id/with+url=chars", "2020-03-10 00:00:00"),
+])
+def test_cursor_round_trip(created, claim_id, expected_created):
+    cursor = encode_cursor(created, claim_id)
+
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == (expected_created, claim_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64 at all!",
+    raw_cursor({"created": None, "id": "X"}),
+    raw_cursor(["2020-03-10 10:00:00"]),
+    raw_cursor(["2020-03-10 10:00:00", "X", "extra"]),
+    raw_cursor(["yesterday", "X"]),
+    raw_cursor([20200310, "X"]),
+    raw_cursor(["2020-03-10 10:00:00", 42]),
+    raw_cursor([None, None]),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode("ascii"),
+])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
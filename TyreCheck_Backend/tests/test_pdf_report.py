@@ -0,0 +1,48 @@
+'''
+Claim report PDF rendering (Utils/pdfReport.py) with images from a temp upload dir
+'''
+
+import pytest
+from PIL import Image
+
+from Utils import imageVariants
+from Utils.pdfReport import render_claim_report_pdf
+
+
+COLUMNS = ["Claim_Warranty_Id", "Dealer_name", "FinalDamageOutput"]
+
+
+@pytest.fixture
+def image_root(tmp_path, monkeypatch):
+    root = tmp_path / "uploads"
+    (root / "CLAIM1").mkdir(parents=True)
+    Image.new("RGB", (2000, 1500), "grey").save(root / "CLAIM1" / "defect-outside_1.jpg", "JPEG")
+    monkeypatch.setattr(imageVariants, "VARIANT_DIR", str(root / ".variants"))
+    return root
+
+
+def test_claim_images_are_embedded_from_resized_variants(image_root, tmp_path):
+    rows = [{"Claim_Warranty_Id": "CLAIM1", "Dealer_name": "Test Tyres", "FinalDamageOutput": "Cut"}]
+    images = {"CLAIM1": [
+        {"ImageType": "Outside", "folder_name": "CLAIM1", "Image_name": "defect-outside_1.jpg"},
+        {"ImageType": "Inside", "folder_name": "CLAIM1", "Image_name": "missing.jpg"},
+    ]}
+    output = tmp_path / "report.pdf"
+
+    render_claim_report_pdf(rows, COLUMNS, {"dealer_code": "DLR1"}, images, str(image_root), str(output))
+
+    variant = image_root / ".variants" / "CLAIM1" / f"defect-outside_1.w{imageVariants.snap_width(480)}.jpeg"
+    assert variant.exists()
+    with Image.open(variant) as resized:
+        assert resized.width <= imageVariants.snap_width(480)
+    assert output.read_bytes().startswith(b"%PDF")
+    assert b"/Subtype /Image" in output.read_bytes()
+
+
+def test_values_with_markup_characters_render_as_text(image_root, tmp_path):
+    rows = [{"Claim_Warranty_Id": "A&B<1>", "Dealer_name": '{"a": "<b"}', "FinalDamageOutput": "x <font> y"}]
+    output = tmp_path / "report.pdf"
+
+    render_claim_report_pdf(rows, COLUMNS, {"claim_id": "A&B<1>"}, {}, str(image_root), str(output))
+
+    assert output.read_bytes().startswith(b"%PDF")
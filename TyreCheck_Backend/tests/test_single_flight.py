@@ -0,0 +1,30 @@
+'''
+Request coalescing and claim-data invalidation (Utils/singleFlight.py)
+'''
+
+import asyncio
+
+from Utils.singleFlight import SingleFlight, claim_total_cache, invalidate_claim_queries
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "rows"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("key", factory) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["rows"] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+
+
+def test_invalidate_claim_queries_clears_claim_totals():
+    claim_total_cache.set(("DLR1", None, None, None, None), 42)
+    invalidate_claim_queries()
+    assert claim_total_cache.get(("DLR1", None, None, None, None)) is None
@@ -0,0 +1,136 @@
+'''
+Streaming image uploads and archive unpacking (Controllers/uploadController.py)
+into the scratch UPLOAD_DIR set up by conftest.py
+'''
+
+import asyncio
+import io
+import os
+import uuid
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from Controllers import uploadController
+from Controllers.uploadController import ArchiveLimitExceeded, iter_archive_members, save_image_stream, save_many
+from Utils.uploads import folder_path
+
+
+def jpeg_bytes(colour="blue") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), colour).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class _Upload:
+    """The part of UploadFile iter_archive_members uses."""
+
+    def __init__(self, data: bytes):
+        self.file = io.BytesIO(data)
+
+
+def zip_of(members: dict) -> _Upload:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return _Upload(buffer.getvalue())
+
+
+@pytest.fixture
+def folder():
+    return f"TEST_{uuid.uuid4().hex[:12]}"
+
+
+async def chunked(data: bytes, size: int = 1000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def save(folder, filename, data):
+    return asyncio.run(save_image_stream(folder, filename, chunked(data)))
+
+
+def test_identical_reupload_is_unchanged(folder):
+    data = jpeg_bytes()
+    first = save(folder, "defect-outside_1.jpg", data)
+    path = os.path.join(folder_path(folder), "defect-outside_1.jpg")
+    mtime = os.stat(path).st_mtime_ns
+
+    second = save(folder, "defect-outside_1.jpg", data)
+
+    assert first["unchanged"] is False
+    assert second["unchanged"] is True
+    assert second["sha256"] == first["sha256"]
+    assert os.stat(path).st_mtime_ns == mtime
+    # no temp files left behind
+    assert os.listdir(folder_path(folder)) == ["defect-outside_1.jpg"]
+
+
+def test_reupload_with_new_bytes_replaces_the_file(folder):
+    save(folder, "defect-outside_1.jpg", jpeg_bytes("blue"))
+    replaced = save(folder, "defect-outside_1.jpg", jpeg_bytes("red"))
+
+    assert replaced["unchanged"] is False
+    with open(os.path.join(folder_path(folder), "defect-outside_1.jpg"), "rb") as f:
+        assert f.read() == jpeg_bytes("red")
+
+
+@pytest.mark.parametrize("filename, data, status", [
+    # right extension, wrong content
+    ("defect-outside_1.jpg", b"<html><script>alert(1)</script></html>" * 10, 415),
+    ("defect-outside_1.png", b"GIF89a" + bytes(100), 415),
+    ("defect-outside_1.jpg", b"", 400),
+    ("defect-outside_1.gif", b"GIF89a" + bytes(100), 415),
+])
+def test_non_images_are_rejected_and_nothing_is_kept(folder, filename, data, status):
+    with pytest.raises(HTTPException) as error:
+        save(folder, filename, data)
+
+    assert error.value.status_code == status
+    assert not os.path.isdir(folder_path(folder)) or os.listdir(folder_path(folder)) == []
+
+
+def test_oversized_upload_is_rejected(folder, monkeypatch):
+    monkeypatch.setattr(uploadController, "MAX_UPLOAD_BYTES", 2000)
+
+    with pytest.raises(HTTPException) as error:
+        save(folder, "defect-outside_1.jpg", jpeg_bytes()[:16] + bytes(5000))
+
+    assert error.value.status_code == 413
+    assert os.listdir(folder_path(folder)) == []
+
+
+def test_archive_members_are_saved(folder):
+    archive = zip_of({"claim/defect-outside_1.jpg": jpeg_bytes(), "defect-inside_1.jpg": jpeg_bytes("red")})
+
+    result = asyncio.run(save_many(folder, iter_archive_members(archive)))
+
+    assert (result["saved"], result["failed"]) == (2, 0)
+    assert sorted(os.listdir(folder_path(folder))) == ["defect-inside_1.jpg", "defect-outside_1.jpg"]
+
+
+def test_too_many_members_aborts_and_removes_saved_files(folder, monkeypatch):
+    monkeypatch.setattr(uploadController, "MAX_ARCHIVE_MEMBERS", 2)
+    archive = zip_of({f"defect-outside_{i}.jpg": jpeg_bytes() for i in range(3)})
+
+    with pytest.raises(ArchiveLimitExceeded) as error:
+        asyncio.run(save_many(folder, iter_archive_members(archive)))
+
+    assert error.value.status_code == 413
+    assert os.listdir(folder_path(folder)) == []
+
+
+def test_expanded_size_cap_aborts_a_compression_bomb(folder, monkeypatch):
+    monkeypatch.setattr(uploadController, "MAX_BATCH_UPLOAD_BYTES", 1024 * 1024)
+    # A JPEG header followed by zeros: tiny compressed, large unpacked
+    bomb = jpeg_bytes()[:16] + bytes(2 * 1024 * 1024)
+    archive = zip_of({"defect-outside_1.jpg": jpeg_bytes(), "defect-outside_2.jpg": bomb})
+    assert len(archive.file.getvalue()) < 64 * 1024
+
+    with pytest.raises(ArchiveLimitExceeded):
+        asyncio.run(save_many(folder, iter_archive_members(archive)))
+
+    assert os.listdir(folder_path(folder)) == []
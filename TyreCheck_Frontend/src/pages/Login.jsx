@@ -16,6 +16,8 @@ export default function Login() {
   try {
     const response = await fetch(`${tyrecheck_url}/auth/user/user_login`, {
       method: "POST",
+      // keep the access_token cookie so claim <img> requests are authenticated
+      credentials: "include",
       headers: {
         "Content-Type": "application/x-www-form-urlencoded",
       },
@@ -19,6 +19,9 @@ const Summary = () => {
   const [overallreportData, setOverallReportData] = useState(null);
   const [summarydata, setSummaryData] = useState(null);
   const [aiSummary, setAiSummary] = useState([]);
+  const [aiRows, setAiRows] = useState([]);
+  const [aiPage, setAiPage] = useState(1);
+  const [aiHasMore, setAiHasMore] = useState(false);
 
 
   // dealer-wise report data
@@ -105,27 +108,11 @@ const Summary = () => {
 
   // fetch AI Summary
 
-  const fetchAiSummary = async () => {
-  try {
-    const token = localStorage.getItem("access_token");
-    const response = await fetch(`${tyrecheck_url}/auth/summary/ai_summary`, {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-        ...(token ? { Authorization: `Bearer ${token}` } : {}),
-      },
-      body: JSON.stringify({
-        dealer_id: null,
-        service_type: "claim",
-        fromDate: null,
-        toDate: null
-      })
-    });
+  // Rows per /ai_summary page; more are fetched with "Load more"
+  const AI_SUMMARY_PAGE_SIZE = 500;
 
-    const rows = await response.json();
-
-    // --- GROUP THE RESULT HERE ---
-    const grouped = Object.values(
+  const groupAiRows = (rows) =>
+    Object.values(
       rows.reduce((acc, row) => {
         const code = row.Dealer_code;
 
@@ -146,9 +133,37 @@ const Summary = () => {
       }, {})
     );
 
+  const fetchAiSummary = async (page = 1) => {
+  try {
+    const token = localStorage.getItem("access_token");
+    const response = await fetch(`${tyrecheck_url}/auth/summary/ai_summary`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({
+        dealer_id: null,
+        service_type: "claim",
+        fromDate: null,
+        toDate: null,
+        page,
+        limit: AI_SUMMARY_PAGE_SIZE
+      })
+    });
+
+    const pageRows = await response.json();
+    const rows = page === 1 ? pageRows : [...aiRows, ...pageRows];
+    setAiRows(rows);
+    setAiPage(page);
+    setAiHasMore(response.headers.get("X-Has-More") === "true");
+
+    // --- GROUP THE RESULT HERE ---
+    const grouped = groupAiRows(rows);
+
     setAiSummary(grouped);
     setDealerReportData(grouped); // Used by your table
-    console.log("Grouped AI Summary:", grouped);
+    return grouped;
 
   } catch (error) {
     console.error(error);
@@ -585,6 +600,13 @@ const Summary = () => {
                   </table>
                 </div>
                 {/* end dealer-table-wrap */}
+                {aiHasMore && (
+                  <div style={{ textAlign: "center", marginTop: 12 }}>
+                    <button className="search-action-btn" onClick={() => fetchAiSummary(aiPage + 1)}>
+                      Load more
+                    </button>
+                  </div>
+                )}
               </div>
             </div>
           )}
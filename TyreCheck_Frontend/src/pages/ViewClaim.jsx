@@ -164,6 +164,11 @@ const ViewClaim = () => {
                 item.Image_name && item.folder_name
                   ? `${tyrecheck_url}/protected_claim/images/${item.folder_name}/${item.Image_name}`
                   : null,
+              // resized variant for the table; the preview modal keeps the full image
+              thumb:
+                item.Image_name && item.folder_name
+                  ? `${tyrecheck_url}/protected_claim/images/${item.folder_name}/${item.Image_name}?w=480`
+                  : null,
             },
             aiResult,
             editAiResult: item.CorrectedValue ?? "",
@@ -362,7 +367,7 @@ const ViewClaim = () => {
                               }}
                             >
                               {r.image.src ? (
-                                <img src={r.image.src} alt="Image Not Found" />
+                                <img src={r.image.thumb || r.image.src} alt="Image Not Found" loading="lazy" />
                               ) : (
                                 <div className="image-box">No image</div>
                               )}